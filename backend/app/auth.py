@@ -1,40 +1,107 @@
+import asyncio
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from fastapi import Depends, HTTPException, status, Request
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+from fastapi import Depends, HTTPException, status, Request, WebSocket
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from jose import JWTError, jwt
+from bson import ObjectId
+from bson.errors import InvalidId
 from . import models
 from .db import get_db
-from pymongo.mongo_client import MongoClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from .config import settings
+from .passwords import verify_password, get_password_hash
 
 SECRET_KEY = settings.JWT_SECRET
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__ident="2b")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+class PrincipalCache:
+    """
+    Bounded LRU cache of authenticated principals, keyed by user id, with a
+    per-entry TTL. Each worker keeps its own copy; the TTL bounds how long a
+    change made through another worker can go unnoticed.
+    """
 
-def verify_password(plain_password, hashed_password):
-    print(f"--- AUTH: Verifying password. Plain: '{plain_password}', Hashed: '{hashed_password}' ---")
-    try:
-        is_verified = pwd_context.verify(plain_password, hashed_password)
-        print(f"--- AUTH: Password verification result: {is_verified} ---")
-        return is_verified
-    except Exception as e:
-        print(f"--- AUTH: ERROR during password verification: {e} ---")
-        return False
-
-def get_password_hash(password):
-    print("--- Hashing password ---")
-    try:
-        hashed_password = pwd_context.hash(password)
-        print("--- Password hashed successfully ---")
-        return hashed_password
-    except Exception as e:
-        print(f"ERROR during password hashing: {e}")
-        raise
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, user_id: str):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return principal
+
+    def put(self, user_id: str, principal: models.Principal):
+        self._entries[user_id] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated process pool so a burst of logins cannot
+    starve the event loop or the shared threadpool. At most `max_pending`
+    hash/verify calls may be queued or running at once; beyond that callers
+    get a 429 straight away instead of waiting behind the backlog.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+
+    def start(self):
+        if self._executor is None:
+            # spawn keeps the children free of the parent's event loop and
+            # Mongo client state; they only import app.passwords.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many authentication requests, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str):
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str):
+        return await self._run(verify_password, plain_password, hashed_password)
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -43,7 +110,29 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(request: Request, db: MongoClient = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def get_current_user(request: Request, db: AsyncIOMotorDatabase = Depends(get_db), token: str = Depends(oauth2_scheme)):
+    return await principal_from_token(db, token)
+
+def websocket_token(websocket: WebSocket, allowed_origins: Iterable[str] = ()) -> Optional[str]:
+    """
+    Token of a WebSocket handshake: a Bearer header, ?token=, or the
+    access_token cookie set at login, which is all the web client has. The
+    cookie only counts for handshakes from this host or `allowed_origins`,
+    so another site cannot open a socket with a visitor's cookie.
+    """
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+    token = websocket.query_params.get("token")
+    if token:
+        return token
+    cookie = websocket.cookies.get("access_token")
+    origin = websocket.headers.get("origin")
+    if cookie and (not origin or origin in allowed_origins or urlsplit(origin).netloc == websocket.headers.get("host")):
+        return cookie
+    return None
+
+async def principal_from_token(db: AsyncIOMotorDatabase, token: str) -> models.Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -52,14 +141,27 @@ def get_current_user(request: Request, db: MongoClient = Depends(get_db), token:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
+        user_id: str = payload.get("uid")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.users.find_one({"email": email})
-    if user is None:
+
+    if user_id:
+        principal = principal_cache.get(user_id)
+        if principal is not None and principal.email == email:
+            return principal
+        try:
+            query = {"_id": ObjectId(user_id)}
+        except InvalidId:
+            raise credentials_exception
+    else:
+        # Tokens issued before the uid claim was added.
+        query = {"email": email}
+
+    user = await db.users.find_one(query, {"email": 1})
+    if user is None or user["email"] != email:
         raise credentials_exception
-    user_data = user.copy()
-    user_data["id"] = str(user_data.pop("_id"))
-    user_model = models.User(**user_data)
-    return user_model
+    principal = models.Principal(id=str(user["_id"]), email=user["email"])
+    principal_cache.put(principal.id, principal)
+    return principal
@@ -1,96 +1,365 @@
-from .db import get_db
+"""
+Weekly reflection generation.
+
+A run works set-based rather than user by user:
+
+* one $group aggregation streams every user's moment count and first and
+  last text in the run's window, ordered by userId; their term counts come
+  from the daily rollups (see app.terms), also in userId order. Both are
+  merge-joined with the users collection, so users with no moments still get
+  a reflection;
+* reflections are written in chunks of REFLECTION_CHUNK_SIZE with one
+  bulk_write each, as upserts keyed by (userId, runId) so a replayed chunk
+  never duplicates anything;
+* after each chunk the run document in `reflection_runs` records the last
+  userId written. If the process dies, the next call picks up the unfinished
+  run, keeps its original window and continues after that userId.
+
+Work inside a run is staged (ReflectionPipeline): summaries are computed on a
+process pool (themes TF-IDF-ranked a batch at a time against the term_df
+table, loaded once per run), audio is synthesized on a thread pool, and the calling thread
+only streams input and writes results. At most REFLECTION_MAX_PENDING_CHUNKS
+chunks wait in each stage, so memory stays flat however many users there are,
+and chunks leave the pipeline in input order so checkpoints stay a prefix.
+"""
+from .db import db as default_db
+from .config import settings
+from .rollups import ROLLUP_COLLECTION, day_of
+from .summaries import set_document_frequency, summarize_batch
+from .terms import DOCUMENTS_KEY, TERM_DF_COLLECTION
+from .tts import tts_cache
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from gtts import gTTS
-import os
-from collections import Counter
-import re
-import asyncio
-from .ws_manager import connected_clients
-
-# A list of common English stopwords to exclude from theme analysis
-STOPWORDS = set([
-    "i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you", "your", "yours",
-    "yourself", "yourselves", "he", "him", "his", "himself", "she", "her", "hers",
-    "herself", "it", "its", "itself", "they", "them", "their", "theirs", "themselves",
-    "what", "which", "who", "whom", "this", "that", "these", "those", "am", "is", "are",
-    "was", "were", "be", "been", "being", "have", "has", "had", "having", "do", "does",
-    "did", "doing", "a", "an", "the", "and", "but", "if", "or", "because", "as", "until",
-    "while", "of", "at", "by", "for", "with", "about", "against", "between", "into",
-    "through", "during", "before", "after", "above", "below", "to", "from", "up", "down",
-    "in", "out", "on", "off", "over", "under", "again", "further", "then", "once", "here",
-    "there", "when", "where", "why", "how", "all", "any", "both", "each", "few", "more",
-    "most", "other", "some", "such", "no", "nor", "not", "only", "own", "same", "so",
-    "than", "too", "very", "s", "t", "can", "will", "just", "don", "should", "now"
-])
-
-def get_moment_text(moment):
-    return moment.get("text", "")
-
-async def broadcast_reflection_update(data):
-    for client in connected_clients:
-        await client.send_json(data)
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+import logging
+import multiprocessing
+import time
+from .ws_manager import publish_many
 
-def generate_weekly_reflections():
-    db = get_db()
-    users = db.users.find()
-    
-    audio_dir = "static/audio"
-    if not os.path.exists(audio_dir):
-        os.makedirs(audio_dir)
+logger = logging.getLogger(__name__)
+
+# Users per analysis task; large enough to amortise pickling, small enough
+# that one chunk spreads over every worker.
+ANALYSIS_BATCH_SIZE = 250
+
+def _start_or_resume_run(db, now):
+    run = db.reflection_runs.find_one({"status": "running"}, sort=[("startedAt", -1)])
+    if run:
+        logger.info("Resuming reflection run", extra={
+            "runId": str(run["_id"]), "after": str(run.get("lastUserId")), "processed": run.get("processed", 0)
+        })
+        return run
+    run = {
+        "_id": ObjectId(),
+        "status": "running",
+        "windowStart": now - timedelta(days=7),
+        "windowEnd": now,
+        "startedAt": now,
+        "updatedAt": now,
+        "lastUserId": None,
+        "processed": 0,
+    }
+    db.reflection_runs.insert_one(run)
+    logger.info("Started reflection run", extra={"runId": str(run["_id"])})
+    return run
+
+def _users_after(db, last_user_id):
+    query = {"_id": {"$gt": last_user_id}} if last_user_id else {}
+    return db.users.find(query, {"_id": 1}).sort("_id", 1)
+
+def _moments_by_user(db, run):
+    """One $group over the window: (userId, count, first and last text), in userId order."""
+    match = {"createdAt": {"$gte": run["windowStart"], "$lt": run["windowEnd"]}}
+    if run.get("lastUserId"):
+        match["userId"] = {"$gt": run["lastUserId"]}
+    return db.moments.aggregate([
+        {"$match": match},
+        {"$sort": {"userId": 1, "createdAt": 1}},
+        {"$group": {"_id": "$userId", "count": {"$sum": 1}, "first": {"$first": "$text"}, "last": {"$last": "$text"}}},
+        {"$sort": {"_id": 1}},
+    ], allowDiskUse=True)
+
+def _terms_by_user(db, run):
+    """
+    Each user's term counts over the window's days, in userId order. Rollups
+    are per day, so the window is widened to whole days.
+    """
+    query = {"day": {"$gte": day_of(run["windowStart"]), "$lt": run["windowEnd"]}}
+    if run.get("lastUserId"):
+        query["userId"] = {"$gt": run["lastUserId"]}
+    rollups = db[ROLLUP_COLLECTION].find(query, {"userId": 1, "terms": 1}).sort([("userId", 1), ("day", 1)])
+    user_id, terms = None, Counter()
+    for rollup in rollups:
+        if rollup["userId"] != user_id:
+            if user_id is not None:
+                yield {"_id": user_id, "terms": terms}
+            user_id, terms = rollup["userId"], Counter()
+        terms.update(rollup.get("terms") or {})
+    if user_id is not None:
+        yield {"_id": user_id, "terms": terms}
 
+def _load_document_frequency(db):
+    """The whole term_df table as {term: df} and the number of moments counted."""
+    document_frequency = {doc["_id"]: doc["df"] for doc in db[TERM_DF_COLLECTION].find({}, {"df": 1})}
+    return document_frequency, document_frequency.pop(DOCUMENTS_KEY, 0)
+
+def _next_matching(stream, current, user_id):
+    # Entries whose user no longer exists sort in between; skip them.
+    while current is not None and current["_id"] < user_id:
+        current = next(stream, None)
+    return current
+
+def _user_weeks(users, groups, terms):
+    """
+    Merge-joins three _id-ordered streams, yielding
+    (userId, (count, first text, last text, term counts)) for every user.
+    """
+    group = next(groups, None)
+    user_terms = next(terms, None)
     for user in users:
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        moments_cursor = db.moments.find({
-            "userId": user["_id"],
-            "createdAt": {"$gte": seven_days_ago}
-        }).sort("createdAt", 1)
-        
-        moments = list(moments_cursor)
-        moments_count = len(moments)
-        summary_text = "No moments logged this week. Try to capture a few thoughts next week!"
-
-        if moments_count == 1:
-            moment_text = get_moment_text(moments)
-            summary_text = f"This week you captured one moment: '{moment_text}'. What will you focus on next?"
-        elif moments_count > 1:
-            all_text = " ".join([get_moment_text(m) for m in moments])
-            words = [word for word in re.findall(r'\b\w+\b', all_text.lower()) if word not in STOPWORDS]
-            
-            most_common_word_tuple = Counter(words).most_common(1)
-            most_common_word = most_common_word_tuple if most_common_word_tuple else "reflection"
-
-            first_moment_text = get_moment_text(moments)
-            last_moment_text = get_moment_text(moments[-1])
-            
-            summary_text = (
-                f"This week you logged {moments_count} moments. "
-                f"You started by reflecting on '{first_moment_text}' and ended on '{last_moment_text}'. "
-                f"A recurring theme in your moments was '{most_common_word}'. Keep reflecting!"
-            )
-
-        reflection_data = {
-            "userId": user["_id"],
-            "reflectionData": summary_text,
-            "summaryText": summary_text,
-            "generatedAt": datetime.now(),
-            "audioUrl": None
-        }
-        
-        result = db.weekly_reflections.insert_one(reflection_data)
-        reflection_id = result.inserted_id
-        
+        user_id = user["_id"]
+        group = _next_matching(groups, group, user_id)
+        user_terms = _next_matching(terms, user_terms, user_id)
+        week = (0, None, None, {})
+        if group is not None and group["_id"] == user_id:
+            week = (group["count"], group["first"] or "", group["last"] or "", {})
+            group = next(groups, None)
+        if user_terms is not None and user_terms["_id"] == user_id:
+            if week[0]:
+                week = week[:3] + (user_terms["terms"],)
+            user_terms = next(terms, None)
+        yield user_id, week
+
+def _reflection_message(reflection):
+    return {
+        "type": "weekly_reflection",
+        "runId": str(reflection["runId"]),
+        "summaryText": reflection["summaryText"],
+        "theme": reflection["theme"],
+        "momentCount": reflection["momentCount"],
+        "audioUrl": reflection["audioUrl"],
+        "generatedAt": reflection["generatedAt"].isoformat(),
+    }
+
+def _synthesize(summary_text):
+    try:
+        # Cached by content, so identical summaries are synthesized once.
+        return tts_cache.audio_url(summary_text)
+    except Exception:
+        logger.exception("TTS generation failed")
+        return None
+
+class ReflectionPipeline:
+    """
+    Three stages per chunk of users, each holding at most `max_pending` chunks:
+
+    1. analysis: summarize_batch on the process pool (CPU-bound TF-IDF
+       scoring);
+    2. write: one bulk_write of reflection upserts from the calling thread,
+       then one gTTS call per reflection on the thread pool (I/O-bound);
+    3. finish: one bulk_write of audio URLs and the run checkpoint, then one
+       insert of WebSocket events for the chunk's users (see ws_manager).
+
+    Each stage is a FIFO, so chunks finish in the order they were submitted.
+    """
+
+    def __init__(self, db, run, analysis_workers, tts_workers, max_pending, synthesize_audio=True, on_progress=None,
+                 document_frequency=None, total_documents=0):
+        self.db = db
+        self.run = run
+        self.analysis_workers = analysis_workers
+        self.tts_workers = tts_workers
+        self.max_pending = max_pending
+        self.synthesize_audio = synthesize_audio
+        self.on_progress = on_progress
+        self.document_frequency = document_frequency or {}
+        self.total_documents = total_documents
+        self.processed = 0
+        self._analysis = deque()
+        self._synthesis = deque()
+        self._analysis_pool = None
+        self._tts_pool = None
+
+    def __enter__(self):
+        # spawn keeps the children free of the parent's Mongo client state;
+        # they only import app.summaries. The document frequencies are sent
+        # once per worker rather than with every batch.
+        self._analysis_pool = ProcessPoolExecutor(
+            max_workers=self.analysis_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=set_document_frequency,
+            initargs=(self.document_frequency, self.total_documents),
+        )
+        if self.synthesize_audio:
+            self._tts_pool = ThreadPoolExecutor(max_workers=self.tts_workers, thread_name_prefix="tts")
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        failed = exc_type is not None
+        self._analysis_pool.shutdown(wait=not failed, cancel_futures=failed)
+        if self._tts_pool is not None:
+            self._tts_pool.shutdown(wait=not failed, cancel_futures=failed)
+
+    @property
+    def users_per_second(self):
+        elapsed = time.perf_counter() - self._started
+        return self.processed / elapsed if elapsed else 0.0
+
+    def submit(self, users):
+        """Queues one chunk of (userId, week) pairs; see _user_weeks."""
+        weeks = [week for _, week in users]
+        futures = [
+            self._analysis_pool.submit(summarize_batch, weeks[i:i + ANALYSIS_BATCH_SIZE])
+            for i in range(0, len(weeks), ANALYSIS_BATCH_SIZE)
+        ]
+        self._analysis.append((users, futures))
+        # Back-pressure: the producer waits here once the stage is full.
+        while len(self._analysis) > self.max_pending:
+            self._write_next()
+
+    def drain(self):
+        while self._analysis:
+            self._write_next()
+        while self._synthesis:
+            self._finish_next()
+
+    def _write_next(self):
+        users, futures = self._analysis.popleft()
+        summaries = [summary for future in futures for summary in future.result()]
+        generated_at = datetime.utcnow()
+        chunk = [
+            {
+                "_id": ObjectId(),
+                "userId": user_id,
+                "runId": self.run["_id"],
+                "reflectionData": summary_text,
+                "summaryText": summary_text,
+                "theme": theme,
+                "momentCount": week[0],
+                "generatedAt": generated_at,
+                "audioUrl": None,
+            }
+            for (user_id, week), (summary_text, theme) in zip(users, summaries)
+        ]
+        keys = [{"userId": r["userId"], "runId": self.run["_id"]} for r in chunk]
+        self.db.weekly_reflections.bulk_write(
+            [UpdateOne(key, {"$setOnInsert": r}, upsert=True) for key, r in zip(keys, chunk)],
+            ordered=False,
+        )
+
+        audio = None
+        if self._tts_pool is not None:
+            audio = [self._tts_pool.submit(_synthesize, r["summaryText"]) for r in chunk]
+        self._synthesis.append((chunk, keys, audio))
+        while len(self._synthesis) > self.max_pending:
+            self._finish_next()
+
+    def _finish_next(self):
+        chunk, keys, audio = self._synthesis.popleft()
+        if audio:
+            audio_updates = []
+            for key, reflection, future in zip(keys, chunk, audio):
+                audio_url = future.result()
+                if audio_url:
+                    reflection["audioUrl"] = audio_url
+                    audio_updates.append(UpdateOne(key, {"$set": {"audioUrl": audio_url}}))
+            if audio_updates:
+                self.db.weekly_reflections.bulk_write(audio_updates, ordered=False)
+
+        # Checkpoint only once the whole chunk is durable.
+        last_user_id = chunk[-1]["userId"]
+        self.db.reflection_runs.update_one(
+            {"_id": self.run["_id"]},
+            {"$set": {"lastUserId": last_user_id, "updatedAt": datetime.utcnow()},
+             "$inc": {"processed": len(chunk)}},
+        )
+        self.run["lastUserId"] = last_user_id
+        self.processed += len(chunk)
+        logger.info("Reflection run progress", extra={
+            "runId": str(self.run["_id"]),
+            "processed": self.processed,
+            "usersPerSecond": round(self.users_per_second, 1),
+            "analysisWorkers": self.analysis_workers,
+            "ttsWorkers": self.tts_workers if self._tts_pool else 0,
+        })
+        if self.on_progress is not None:
+            self.on_progress({
+                "runId": str(self.run["_id"]),
+                "processed": self.run.get("processed", 0) + self.processed,
+                "usersPerSecond": round(self.users_per_second, 1),
+            })
+
+        try:
+            publish_many(self.db, ((r["userId"], _reflection_message(r)) for r in chunk))
+        except PyMongoError as e:
+            # Live updates are best effort; the reflections themselves are written.
+            logger.warning("Could not publish reflection updates", extra={"runId": str(self.run["_id"]), "error": str(e)})
+
+def _referenced_audio(db, urls):
+    """Those of `urls` that a reflection from the last TTS_REFERENCE_DAYS points at."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.TTS_REFERENCE_DAYS)
+    return db.weekly_reflections.distinct("audioUrl", {"audioUrl": {"$in": urls}, "generatedAt": {"$gte": cutoff}})
+
+def run_weekly_reflections(db, chunk_size=None, synthesize_audio=True, analysis_workers=None, tts_workers=None, max_pending=None, on_progress=None):
+    """
+    Generates (or resumes generating) this week's reflection for every user.
+    `on_progress` is called with a progress dict after every chunk. Returns a
+    summary of the run.
+    """
+    chunk_size = chunk_size or settings.REFLECTION_CHUNK_SIZE
+    run = _start_or_resume_run(db, datetime.utcnow())
+    resumed_from = run.get("processed", 0)
+    document_frequency, total_documents = _load_document_frequency(db)
+
+    pipeline = ReflectionPipeline(
+        db,
+        run,
+        analysis_workers=analysis_workers or settings.REFLECTION_ANALYSIS_WORKERS,
+        tts_workers=tts_workers or settings.REFLECTION_TTS_WORKERS,
+        max_pending=max_pending or settings.REFLECTION_MAX_PENDING_CHUNKS,
+        synthesize_audio=synthesize_audio,
+        on_progress=on_progress,
+        document_frequency=document_frequency,
+        total_documents=total_documents,
+    )
+    with pipeline:
+        users = []
+        weeks = _user_weeks(_users_after(db, run.get("lastUserId")), _moments_by_user(db, run), _terms_by_user(db, run))
+        for user in weeks:
+            users.append(user)
+            if len(users) >= chunk_size:
+                pipeline.submit(users)
+                users = []
+        if users:
+            pipeline.submit(users)
+        pipeline.drain()
+
+    db.reflection_runs.update_one(
+        {"_id": run["_id"]},
+        {"$set": {"status": "completed", "finishedAt": datetime.utcnow()}},
+    )
+    if synthesize_audio:
+        # The run's outcome is already recorded; a failed eviction only means a fuller cache.
         try:
-            tts = gTTS(text=summary_text, lang='en')
-            audio_filename = f"{reflection_id}.mp3"
-            audio_path = os.path.join(audio_dir, audio_filename)
-            tts.save(audio_path)
-            
-            audio_url = f"/static/audio/{audio_filename}"
-            db.weekly_reflections.update_one(
-                {"_id": reflection_id},
-                {"$set": {"audioUrl": audio_url}}
-            )
-        except Exception as e:
-            print(f"Error generating TTS for reflection {reflection_id}: {e}")
-        
-        asyncio.run(broadcast_reflection_update(reflection_data))
\ No newline at end of file
+            tts_cache.evict(lambda urls: _referenced_audio(db, urls))
+        except (PyMongoError, OSError) as e:
+            logger.warning("TTS cache eviction failed", extra={"runId": str(run["_id"]), "error": str(e)})
+    logger.info("Reflection run completed", extra={
+        "runId": str(run["_id"]),
+        "processed": pipeline.processed,
+        "resumedFrom": resumed_from,
+        "usersPerSecond": round(pipeline.users_per_second, 1),
+    })
+    return {
+        "runId": str(run["_id"]),
+        "processed": pipeline.processed,
+        "resumedFrom": resumed_from,
+        "usersPerSecond": round(pipeline.users_per_second, 1),
+    }
+
+def generate_weekly_reflections():
+    return run_weekly_reflections(default_db)
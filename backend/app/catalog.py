@@ -0,0 +1,148 @@
+"""
+In-process copy of the small, rarely changing content collections.
+
+`quotes`, `articles`, `calendar_insights` and `reflection_suggestions` hold a
+handful of seed documents, but the dashboard and weekly reflection used to
+query them ($sample / full scans) on every request. Each worker now keeps an
+immutable snapshot of all four and samples from it locally.
+
+The snapshot is versioned by a single counter document in `catalog_meta`.
+Anything that edits content calls `bump_catalog_version`; the background
+refresher polls that one document every CATALOG_POLL_SECONDS and reloads only
+when the version moved. A full reload also happens every CATALOG_TTL_SECONDS
+so edits made without a version bump still show up eventually.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from typing import NamedTuple, Optional, Tuple
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_FILTER = {"_id": "content"}
+
+PROJECTIONS = {
+    "quotes": {"quote": 1, "author": 1},
+    "articles": {"title": 1, "summary": 1, "link": 1},
+    "calendar_insights": {"insight": 1},
+    "reflection_suggestions": {"virtue": 1, "practice": 1},
+}
+
+
+def bump_catalog_version(db):
+    """
+    Marks the content collections as changed so every worker reloads them.
+    Works with both pymongo and Motor databases (await the result for Motor).
+    """
+    return db.catalog_meta.update_one(CATALOG_VERSION_FILTER, {"$inc": {"version": 1}}, upsert=True)
+
+
+def _seed_int(seed: str) -> int:
+    # hash() is salted per process; sha256 is stable across workers and restarts.
+    return int.from_bytes(hashlib.sha256(seed.encode()).digest()[:8], "big")
+
+
+class CatalogSnapshot(NamedTuple):
+    version: Optional[int]
+    loaded_at: float
+    quotes: Tuple[dict, ...] = ()
+    articles: Tuple[dict, ...] = ()
+    calendar_insights: Tuple[str, ...] = ()
+    reflection_suggestions: Tuple[dict, ...] = ()
+
+
+class ContentCatalog:
+    def __init__(self, ttl: float, poll_interval: float):
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.snapshot = CatalogSnapshot(version=None, loaded_at=0.0)
+        self._task = None
+
+    async def _version(self, db) -> Optional[int]:
+        meta = await db.catalog_meta.find_one(CATALOG_VERSION_FILTER, {"version": 1})
+        return meta["version"] if meta else None
+
+    async def load(self, db):
+        version = await self._version(db)
+        quotes, articles, insights, suggestions = await asyncio.gather(*(
+            # Sorted so every worker indexes the same documents for daily picks.
+            db[name].find({}, projection).sort("_id", 1).to_list(length=None)
+            for name, projection in PROJECTIONS.items()
+        ))
+        for suggestion in suggestions:
+            suggestion["_id"] = str(suggestion["_id"])
+        # Swap the whole snapshot at once so readers never see a mix of old and new.
+        self.snapshot = CatalogSnapshot(
+            version=version,
+            loaded_at=time.monotonic(),
+            quotes=tuple(quotes),
+            articles=tuple(articles),
+            calendar_insights=tuple(item["insight"] for item in insights if "insight" in item),
+            reflection_suggestions=tuple(suggestions),
+        )
+        logger.info("Content catalog loaded", extra={
+            "version": version,
+            "quotes": len(quotes),
+            "articles": len(articles),
+            "calendarInsights": len(insights),
+            "reflectionSuggestions": len(suggestions),
+        })
+
+    async def refresh(self, db):
+        """Reloads if the version document changed or the snapshot is older than the TTL."""
+        expired = time.monotonic() - self.snapshot.loaded_at >= self.ttl
+        if expired or await self._version(db) != self.snapshot.version:
+            await self.load(db)
+
+    async def _refresh_loop(self, db):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                # Keep serving the previous snapshot until the next attempt.
+                logger.warning("Content catalog refresh failed", extra={"error": str(e)})
+
+    def start(self, db):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # Random picks index straight into the snapshot tuples, so they are O(1)
+    # per item regardless of how many documents the collection holds.
+
+    def random_suggestion(self) -> Optional[dict]:
+        suggestions = self.snapshot.reflection_suggestions
+        return dict(random.choice(suggestions)) if suggestions else None
+
+    def random_insights(self, count: int):
+        insights = self.snapshot.calendar_insights
+        return random.sample(insights, min(count, len(insights)))
+
+    # Daily picks are a pure function of the seed and the snapshot, so every
+    # worker hands the same user the same content for the whole day.
+
+    def daily_quote(self, seed: str) -> Optional[dict]:
+        quotes = self.snapshot.quotes
+        return quotes[_seed_int(seed) % len(quotes)] if quotes else None
+
+    def daily_articles(self, seed: str, count: int):
+        articles = self.snapshot.articles
+        return random.Random(_seed_int(seed)).sample(articles, min(count, len(articles)))
+
+    def all_articles(self):
+        return list(self.snapshot.articles)
+
+
+catalog = ContentCatalog(settings.CATALOG_TTL_SECONDS, settings.CATALOG_POLL_SECONDS)
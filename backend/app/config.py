@@ -6,5 +6,51 @@ load_dotenv()
 class Settings:
     MONGODB_URI: str = os.getenv("MONGODB_URI")
     JWT_SECRET: str = os.getenv("JWT_SECRET")
+    MONGODB_DB_NAME: str = os.getenv("MONGODB_DB_NAME", "innovation_character")
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "5"))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    HEALTH_CHECK_INTERVAL_SECONDS: float = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "10"))
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "3"))
+    DB_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("DB_CIRCUIT_FAILURE_THRESHOLD", "3"))
+    DB_CIRCUIT_RESET_SECONDS: float = float(os.getenv("DB_CIRCUIT_RESET_SECONDS", "30"))
 
-settings = Settings()
\ No newline at end of file
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    MAX_AUDIO_UPLOAD_BYTES: int = int(os.getenv("MAX_AUDIO_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_ROUTE_LEVELS: str = os.getenv("LOG_ROUTE_LEVELS", "")
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    CATALOG_TTL_SECONDS: float = float(os.getenv("CATALOG_TTL_SECONDS", "300"))
+    CATALOG_POLL_SECONDS: float = float(os.getenv("CATALOG_POLL_SECONDS", "15"))
+    REFLECTION_CHUNK_SIZE: int = int(os.getenv("REFLECTION_CHUNK_SIZE", "1000"))
+    REFLECTION_ANALYSIS_WORKERS: int = int(os.getenv("REFLECTION_ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+    REFLECTION_TTS_WORKERS: int = int(os.getenv("REFLECTION_TTS_WORKERS", "8"))
+    REFLECTION_MAX_PENDING_CHUNKS: int = int(os.getenv("REFLECTION_MAX_PENDING_CHUNKS", "4"))
+    TTS_BACKEND: str = os.getenv("TTS_BACKEND", "gtts")
+    TTS_LANG: str = os.getenv("TTS_LANG", "en")
+    TTS_VOICE: str = os.getenv("TTS_VOICE", "com")
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    # Audio of reflections older than this may be evicted; every weekly run writes a newer one.
+    TTS_REFERENCE_DAYS: int = int(os.getenv("TTS_REFERENCE_DAYS", "14"))
+    JOB_POLL_SECONDS: float = float(os.getenv("JOB_POLL_SECONDS", "2"))
+    JOB_HEARTBEAT_SECONDS: float = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+    JOB_STALE_SECONDS: float = float(os.getenv("JOB_STALE_SECONDS", "120"))
+    WS_SEND_TIMEOUT_SECONDS: float = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+    WS_EVENT_TTL_SECONDS: int = int(os.getenv("WS_EVENT_TTL_SECONDS", "3600"))
+    WS_POLL_SECONDS: float = float(os.getenv("WS_POLL_SECONDS", "1"))
+    # How far back each poll looks; must cover commit delays and clock skew between publishers.
+    WS_POLL_OVERLAP_SECONDS: float = float(os.getenv("WS_POLL_OVERLAP_SECONDS", "10"))
+    WS_HEARTBEAT_SECONDS: float = float(os.getenv("WS_HEARTBEAT_SECONDS", "30"))
+    WS_IDLE_TIMEOUT_SECONDS: float = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "90"))
+    WS_MAX_CONNECTIONS: int = int(os.getenv("WS_MAX_CONNECTIONS", "10000"))
+    # 0 disables the memory cap.
+    WS_MAX_RSS_BYTES: int = int(os.getenv("WS_MAX_RSS_BYTES", "0"))
+    GZIP_MIN_BYTES: int = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+    # Past 4 the CPU per response grows much faster than the body shrinks (see benchmarks/bench_json.py).
+    GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", "4"))
+
+settings = Settings()
@@ -1,21 +1,61 @@
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo import MongoClient
+from fastapi import HTTPException, status
 from .config import settings
+from .health import HealthMonitor, db_circuit
 
+# Synchronous client, used by the background tasks and the maintenance scripts
+# (seed_db.py, clear_db.py, ...) that run outside the event loop.
 client = MongoClient(settings.MONGODB_URI)
-db = client.get_database("innovation_character")
-
-def ping_db():
-    try:
-        client.admin.command('ping')
-        return True
-    except Exception as e:
-        print(e)
-        return False
-
-def get_db():
-    if ping_db():
-        print("--- Database connection successful ---")
-        return db
-    else:
-        print("--- Database connection failed ---")
-        return None
\ No newline at end of file
+db = client.get_database(settings.MONGODB_DB_NAME)
+
+logger = logging.getLogger(__name__)
+
+# Pooled asyncio client used by the API handlers. It is created and closed by
+# the FastAPI lifespan (see connect_async_db / close_async_db).
+async_client: AsyncIOMotorClient = None
+async_db: AsyncIOMotorDatabase = None
+
+async def connect_async_db():
+    global async_client, async_db
+    async_client = AsyncIOMotorClient(
+        settings.MONGODB_URI,
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    )
+    async_db = async_client.get_database(settings.MONGODB_DB_NAME)
+    logger.info("Async database client started")
+    return async_db
+
+def close_async_db():
+    global async_client, async_db
+    if async_client is not None:
+        async_client.close()
+        logger.info("Async database client closed")
+    async_client = None
+    async_db = None
+
+async def ping_async_db():
+    # Raises on failure; the health monitor records the error.
+    await async_client.admin.command('ping')
+    return True
+
+health_monitor = HealthMonitor(
+    ping=ping_async_db,
+    breaker=db_circuit,
+    interval=settings.HEALTH_CHECK_INTERVAL_SECONDS,
+    timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+)
+
+async def get_db():
+    # Connection state is tracked by the background health monitor; here we
+    # only consult the circuit breaker so a dead database fails fast.
+    if async_db is None or not db_circuit.allow_request():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable",
+            headers={"Retry-After": str(int(settings.DB_CIRCUIT_RESET_SECONDS))},
+        )
+    return async_db
@@ -0,0 +1,132 @@
+"""
+Streaming export of a user's full history.
+
+GET /api/v1/export writes the user's moments, reflections, weekly reflections
+and received peer feedback as NDJSON (one object per line) or CSV. Each
+section is read through a cursor with batch size EXPORT_BATCH_SIZE and sent on
+as it arrives, one chunk per batch, so memory stays bounded by a batch no
+matter how long the history is.
+
+Sections follow each other in SECTIONS order, and within a section rows come
+newest first in keyset order (see app.pagination). Every row carries a
+`cursor`. Passing that token back as ?cursor= resumes the export right after
+that row, so an interrupted download can continue from the last complete row
+it received. Each CSV response starts with the header row, resumed ones too.
+"""
+import csv
+import io
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pymongo import DESCENDING
+from .pagination import after_cursor, decode_cursor, encode_cursor
+from .responses import dumps
+
+EXPORT_BATCH_SIZE = 500
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+CSV_COLUMNS = ["section", "id", "createdAt", "text", "audioUrl", "theme", "momentCount", "giverId", "cursor"]
+
+
+def _moment_row(doc):
+    return {"createdAt": doc["createdAt"], "text": doc["text"], "audioUrl": doc.get("audioUrl")}
+
+
+def _weekly_row(doc):
+    return {
+        "createdAt": doc["generatedAt"],
+        "text": doc.get("summaryText"),
+        "audioUrl": doc.get("audioUrl"),
+        "theme": doc.get("theme"),
+        "momentCount": doc.get("momentCount"),
+    }
+
+
+def _feedback_row(doc):
+    return {"createdAt": doc["createdAt"], "text": doc["text"], "giverId": doc["giverId"]}
+
+
+# (section, collection, user field, extra filter, timestamp field, projection, row builder).
+# Weekly reflections have no (generatedAt, _id) index; a user has one per week,
+# so sorting them in memory is cheap.
+SECTIONS = [
+    ("moment", "moments", "userId", {"type": "moment"}, "createdAt",
+     {"text": 1, "createdAt": 1, "audioUrl": 1}, _moment_row),
+    ("reflection", "moments", "userId", {"type": "reflection"}, "createdAt",
+     {"text": 1, "createdAt": 1, "audioUrl": 1}, _moment_row),
+    ("weekly_reflection", "weekly_reflections", "userId", {}, "generatedAt",
+     {"summaryText": 1, "generatedAt": 1, "audioUrl": 1, "theme": 1, "momentCount": 1}, _weekly_row),
+    ("peer_feedback", "peer_feedback", "recipientId", {}, "createdAt",
+     {"text": 1, "createdAt": 1, "giverId": 1}, _feedback_row),
+]
+_SECTION_NAMES = [section[0] for section in SECTIONS]
+
+
+def encode_export_cursor(section: str, doc, field: str) -> str:
+    # Base64url never contains ".", so the section name splits off cleanly.
+    return f"{section}.{encode_cursor(doc, field)}"
+
+
+def decode_export_cursor(token: str):
+    """(index into SECTIONS, keyset cursor within it); 400 for a malformed token."""
+    section, _, cursor = (token or "").partition(".")
+    if section not in _SECTION_NAMES or not cursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    decode_cursor(cursor)
+    return _SECTION_NAMES.index(section), cursor
+
+
+async def export_rows(db, user_id: ObjectId, resume=None):
+    """
+    Yields lists of export rows, one per cursor batch. `resume` is a decoded
+    export cursor; decode it before streaming starts, so a bad token is a 400.
+    """
+    start, cursor = resume or (0, None)
+    for index, (section, collection, user_field, extra, field, projection, build) in enumerate(SECTIONS):
+        if index < start:
+            continue
+        query = after_cursor({user_field: user_id, **extra}, cursor if index == start else None, field)
+        docs = db[collection].find(query, projection).sort([(field, DESCENDING), ("_id", DESCENDING)])
+        batch = []
+        async for doc in docs.batch_size(EXPORT_BATCH_SIZE):
+            batch.append({
+                "section": section,
+                "id": doc["_id"],
+                **build(doc),
+                "cursor": encode_export_cursor(section, doc, field),
+            })
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+async def ndjson_chunks(batches):
+    async for batch in batches:
+        yield b"".join(dumps(row) + b"\n" for row in batch)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+async def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    async for batch in batches:
+        for row in batch:
+            writer.writerow([_csv_value(row.get(column)) for column in CSV_COLUMNS])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export.
+    if buffer.tell():
+        yield buffer.getvalue().encode()
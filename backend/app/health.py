@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Tracks consecutive database failures. Once `failure_threshold` failures are
+    recorded the circuit opens and requests are rejected immediately; after
+    `reset_timeout` seconds it lets trial requests through (half-open) until the
+    next success closes it again or the next failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._state = CLOSED
+
+    @property
+    def state(self):
+        if self._state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+        return self._state
+
+    def allow_request(self):
+        return self.state != OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._state = CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != OPEN:
+                logger.warning("Database circuit opened", extra={"failures": self.failures})
+            self._state = OPEN
+            self.opened_at = time.monotonic()
+
+class HealthMonitor:
+    """
+    Pings the database in the background and caches the result, so neither the
+    request path nor /healthz has to pay for a round trip.
+
+    Setup that needs the database (see `when_connected`) runs after the first
+    successful check, and is retried after later ones until it completes.
+    """
+
+    def __init__(self, ping, breaker: CircuitBreaker, interval: float, timeout: float):
+        self.ping = ping
+        self.breaker = breaker
+        self.interval = interval
+        self.timeout = timeout
+        self.connected = False
+        self.last_checked_at = None
+        self.latency_ms = None
+        self.last_error = None
+        self._task = None
+        self._pending = []
+
+    async def check(self):
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(self.ping(), timeout=self.timeout)
+        except Exception as e:
+            ok = False
+            self.last_error = str(e) or type(e).__name__
+        self.latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.last_checked_at = datetime.now(timezone.utc)
+        if ok:
+            if not self.connected:
+                logger.info("Database connection is up")
+            self.last_error = None
+            self.breaker.record_success()
+        else:
+            if self.connected:
+                logger.error("Database connection is down", extra={"error": self.last_error})
+            self.breaker.record_failure()
+        self.connected = ok
+        if ok and self._pending:
+            await self._run_pending()
+        return ok
+
+    def when_connected(self, setup):
+        """Queues `setup`, a coroutine function, to run once the database is reachable."""
+        self._pending.append(setup)
+
+    async def _run_pending(self):
+        for setup in list(self._pending):
+            try:
+                await setup()
+            except Exception as e:
+                logger.warning("Database setup failed, will retry", extra={"setup": setup.__name__, "error": str(e) or type(e).__name__})
+            else:
+                self._pending.remove(setup)
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._pending.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self):
+        return {
+            "status": "ok" if self.connected else "error",
+            "database": "connected" if self.connected else "disconnected",
+            "circuit": self.breaker.state,
+            "lastCheckedAt": self.last_checked_at.isoformat() if self.last_checked_at else None,
+            "latencyMs": self.latency_ms,
+            "error": self.last_error,
+        }
+
+db_circuit = CircuitBreaker(
+    failure_threshold=settings.DB_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.DB_CIRCUIT_RESET_SECONDS,
+)
@@ -0,0 +1,37 @@
+"""
+Conditional GET helpers.
+
+Responses carry a strong ETag derived from the exact body bytes. When the
+client's If-None-Match already names that tag, the body is dropped and a 304
+is sent instead, so a revalidation costs the server-side work but none of the
+payload.
+"""
+import hashlib
+from fastapi import Request, Response
+from .responses import BSONJSONResponse
+
+# Per-user data: browsers may keep it, shared caches may not, and every reuse
+# has to be revalidated with the ETag first.
+PRIVATE_REVALIDATE = "private, no-cache"
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def conditional_json(request: Request, content, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    response = BSONJSONResponse(content=content)
+    etag = strong_etag(response.body)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
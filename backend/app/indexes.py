@@ -0,0 +1,138 @@
+"""
+Declarative index registry.
+
+INDEXES lists every index the application relies on; ensure_indexes() applies
+them at startup. create_indexes is a no-op for indexes that already exist with
+the same specification, so this is safe to run on every boot.
+
+QUERY_SHAPES lists the filtered queries issued by the API. check_indexes.py runs
+explain() on each one and fails if any of them is answered by a COLLSCAN, so a
+new query without a supporting index is caught before it reaches production.
+"""
+import logging
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "moments": [
+        IndexModel([("userId", ASCENDING), ("type", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)], name="userId_type_createdAt_id"),
+        IndexModel([("userId", ASCENDING), ("createdAt", DESCENDING)], name="userId_createdAt"),
+        # Per-user search (app.search); the only text index a collection may have.
+        IndexModel([("userId", ASCENDING), ("text", TEXT)], name="userId_text", default_language="english"),
+        # The weekly reflection run scans one window across all users.
+        IndexModel([("createdAt", ASCENDING)], name="createdAt"),
+    ],
+    "weekly_reflections": [
+        IndexModel([("userId", ASCENDING), ("generatedAt", DESCENDING)], name="userId_generatedAt"),
+        # Makes reflection writes idempotent per run; older documents have no runId.
+        IndexModel([("userId", ASCENDING), ("runId", ASCENDING)], name="userId_runId_unique", unique=True,
+                   partialFilterExpression={"runId": {"$exists": True}}),
+        # TTS cache eviction keeps the files recent reflections still point at.
+        IndexModel([("audioUrl", ASCENDING)], name="audioUrl"),
+    ],
+    "reflection_runs": [
+        IndexModel([("status", ASCENDING), ("startedAt", DESCENDING)], name="status_startedAt"),
+    ],
+    "peer_feedback": [
+        IndexModel([("recipientId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)], name="recipientId_createdAt_id"),
+    ],
+    "integrations": [
+        IndexModel([("userId", ASCENDING)], name="userId"),
+    ],
+    "jobs": [
+        IndexModel([("activeKey", ASCENDING)], name="activeKey_unique", unique=True, sparse=True),
+        IndexModel([("idempotencyKey", ASCENDING)], name="idempotencyKey_unique", unique=True, sparse=True),
+        IndexModel([("status", ASCENDING), ("createdAt", ASCENDING)], name="status_createdAt"),
+        IndexModel([("status", ASCENDING), ("heartbeatAt", ASCENDING)], name="status_heartbeatAt"),
+    ],
+    "daily_rollups": [
+        IndexModel([("userId", ASCENDING), ("day", ASCENDING)], name="userId_day_unique", unique=True),
+    ],
+    "ws_events": [
+        IndexModel([("createdAt", ASCENDING)], name="createdAt_ttl", expireAfterSeconds=settings.WS_EVENT_TTL_SECONDS),
+    ],
+}
+
+_USER_ID = ObjectId()
+_SINCE = datetime(2024, 1, 1)
+_UNTIL = datetime(2024, 1, 8)
+_PAGE = [("createdAt", DESCENDING), ("_id", DESCENDING)]
+_AFTER = {"$or": [{"createdAt": {"$lt": _UNTIL}}, {"createdAt": _UNTIL, "_id": {"$lt": ObjectId()}}]}
+
+# (name, collection, filter, sort) for every filtered query in main.py, auth.py, export.py,
+# background_tasks.py, jobs.py and ws_manager.py.
+QUERY_SHAPES = [
+    ("users by email", "users", {"email": "user@example.com"}, None),
+    ("moments page", "moments", {"userId": _USER_ID, "type": "moment"}, _PAGE),
+    ("moments next page", "moments", {"userId": _USER_ID, "type": "moment", **_AFTER}, _PAGE),
+    ("reflections page", "moments", {"userId": _USER_ID, "type": "reflection"}, _PAGE),
+    ("reflections next page", "moments", {"userId": _USER_ID, "type": "reflection", **_AFTER}, _PAGE),
+    ("moment search", "moments", {"userId": _USER_ID, "$text": {"$search": "resilience"}}, None),
+    ("moments since", "moments", {"userId": _USER_ID, "createdAt": {"$gte": _SINCE}}, None),
+    ("moments between", "moments", {"userId": _USER_ID, "createdAt": {"$gte": _SINCE, "$lt": _UNTIL}}, None),
+    ("moments in window", "moments", {"createdAt": {"$gte": _SINCE, "$lt": _UNTIL}}, None),
+    ("latest weekly reflection", "weekly_reflections", {"userId": _USER_ID}, [("generatedAt", DESCENDING)]),
+    ("audio still referenced", "weekly_reflections",
+     {"audioUrl": {"$in": ["/static/audio/tts/00/0.mp3"]}, "generatedAt": {"$gte": _SINCE}}, None),
+    ("reflection for run", "weekly_reflections", {"userId": _USER_ID, "runId": ObjectId()}, None),
+    ("weekly reflections export", "weekly_reflections",
+     {"userId": _USER_ID, "$or": [{"generatedAt": {"$lt": _UNTIL}}, {"generatedAt": _UNTIL, "_id": {"$lt": ObjectId()}}]},
+     [("generatedAt", DESCENDING), ("_id", DESCENDING)]),
+    ("unfinished reflection run", "reflection_runs", {"status": "running"}, [("startedAt", DESCENDING)]),
+    ("peer feedback page", "peer_feedback", {"recipientId": _USER_ID}, _PAGE),
+    ("peer feedback next page", "peer_feedback", {"recipientId": _USER_ID, **_AFTER}, _PAGE),
+    ("integrations by user", "integrations", {"userId": _USER_ID}, None),
+    ("active job", "jobs", {"activeKey": "generate_reflections"}, None),
+    ("job by idempotency key", "jobs", {"idempotencyKey": "generate_reflections:key"}, None),
+    ("next queued job", "jobs", {"status": "queued"}, [("createdAt", ASCENDING)]),
+    ("stale running jobs", "jobs", {"status": "running", "heartbeatAt": {"$lt": _SINCE}}, None),
+    ("rollups since", "daily_rollups", {"userId": _USER_ID, "day": {"$gte": _SINCE}}, None),
+    ("rollups in window", "daily_rollups", {"userId": {"$gt": _USER_ID}, "day": {"$gte": _SINCE, "$lt": _UNTIL}},
+     [("userId", ASCENDING), ("day", ASCENDING)]),
+    ("recent websocket events", "ws_events", {"createdAt": {"$gte": _SINCE}}, [("createdAt", ASCENDING)]),
+]
+
+async def ensure_indexes(db):
+    for collection, models in INDEXES.items():
+        try:
+            names = await db[collection].create_indexes(models)
+            logger.info("Indexes ensured", extra={"collection": collection, "indexes": names})
+        except OperationFailure as e:
+            # Typically a conflicting existing index or duplicate data under a
+            # new unique index. Keep serving; check_indexes.py will flag it.
+            logger.warning("Could not create indexes", extra={"collection": collection, "error": str(e)})
+
+def ensure_indexes_sync(db):
+    for collection, models in INDEXES.items():
+        db[collection].create_indexes(models)
+
+def _plan_stages(plan):
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan["stage"]] if "stage" in plan else []
+    # Slot-based engine plans nest the classic plan under "queryPlan".
+    for key in ("queryPlan", "inputStage"):
+        stages.extend(_plan_stages(plan.get(key)))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+def explain_query_shapes(db):
+    """Returns (name, collection, winning plan stages) for every query shape."""
+    results = []
+    for name, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = cursor.explain()
+        stages = _plan_stages(explanation["queryPlanner"]["winningPlan"])
+        results.append((name, collection, stages))
+    return results
@@ -0,0 +1,138 @@
+"""
+Persistent background jobs.
+
+The API only records a job in the `jobs` collection and returns its id; a
+separate process (worker.py) claims queued jobs and runs them. Job state:
+
+    queued -> running -> succeeded | failed
+
+Two sparse unique indexes make enqueueing idempotent:
+
+* `activeKey` is set to the job type while a job is queued or running and
+  unset when it finishes, so concurrent triggers of the same type collapse
+  onto the job already in flight;
+* `idempotencyKey` holds the client's Idempotency-Key header, so a retried
+  request gets the job its first attempt created, even after it finished.
+
+Workers heartbeat while running. A running job whose heartbeat is older than
+JOB_STALE_SECONDS is assumed orphaned and put back in the queue; the
+reflection engine then resumes from its own checkpoint.
+"""
+import logging
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+GENERATE_REFLECTIONS = "generate_reflections"
+
+
+async def enqueue(db, job_type: str, idempotency_key: str = None):
+    """Returns (job, created). An equivalent queued/running job is reused."""
+    now = datetime.utcnow()
+    job = {
+        "_id": ObjectId(),
+        "type": job_type,
+        "status": QUEUED,
+        "activeKey": job_type,
+        "createdAt": now,
+        "updatedAt": now,
+        "progress": {},
+        "attempts": 0,
+    }
+    if idempotency_key:
+        job["idempotencyKey"] = f"{job_type}:{idempotency_key}"
+    try:
+        await db.jobs.insert_one(job)
+        logger.info("Job queued", extra={"jobId": str(job["_id"]), "type": job_type})
+        return job, True
+    except DuplicateKeyError:
+        pass
+
+    existing = None
+    if idempotency_key:
+        existing = await db.jobs.find_one({"idempotencyKey": job["idempotencyKey"]})
+    if existing is None:
+        existing = await db.jobs.find_one({"activeKey": job_type})
+    if existing is None:
+        # The conflicting job finished between our insert and the lookup.
+        return await enqueue(db, job_type, idempotency_key)
+    logger.info("Job deduplicated", extra={"jobId": str(existing["_id"]), "type": job_type})
+    return existing, False
+
+
+async def get_job(db, job_id: str):
+    try:
+        oid = ObjectId(job_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    job = await db.jobs.find_one({"_id": oid})
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    return job
+
+
+def job_response(job):
+    return {
+        "id": str(job["_id"]),
+        "type": job["type"],
+        "status": job["status"],
+        "createdAt": job["createdAt"],
+        "startedAt": job.get("startedAt"),
+        "finishedAt": job.get("finishedAt"),
+        "progress": job.get("progress") or {},
+        "result": job.get("result"),
+        "error": job.get("error"),
+    }
+
+
+# --- Worker side (sync pymongo; see worker.py) ---
+
+def claim_next(db, worker_id: str):
+    """Atomically moves the oldest queued job to running and returns it."""
+    now = datetime.utcnow()
+    return db.jobs.find_one_and_update(
+        {"status": QUEUED},
+        {"$set": {"status": RUNNING, "workerId": worker_id, "startedAt": now, "heartbeatAt": now, "updatedAt": now},
+         "$inc": {"attempts": 1}},
+        sort=[("createdAt", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def requeue_stale(db, stale_seconds: float):
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    result = db.jobs.update_many(
+        {"status": RUNNING, "heartbeatAt": {"$lt": cutoff}},
+        {"$set": {"status": QUEUED, "updatedAt": datetime.utcnow()}, "$unset": {"workerId": ""}},
+    )
+    if result.modified_count:
+        logger.warning("Requeued stale jobs", extra={"count": result.modified_count})
+    return result.modified_count
+
+
+def report_progress(db, job_id, progress: dict):
+    now = datetime.utcnow()
+    db.jobs.update_one(
+        {"_id": job_id, "status": RUNNING},
+        {"$set": {"progress": progress, "heartbeatAt": now, "updatedAt": now}},
+    )
+
+
+def finish(db, job_id, result: dict = None, error: str = None):
+    now = datetime.utcnow()
+    update = {"status": FAILED if error else SUCCEEDED, "finishedAt": now, "updatedAt": now}
+    if error:
+        update["error"] = error
+    else:
+        update["result"] = result
+    db.jobs.update_one({"_id": job_id}, {"$set": update, "$unset": {"activeKey": ""}})
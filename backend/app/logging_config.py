@@ -0,0 +1,167 @@
+"""
+Structured, non-blocking logging.
+
+Application code logs through the standard `logging` module. Records are
+filtered on the calling thread (per-route level, sampling, redaction) and
+handed to a bounded in-memory queue; a single QueueListener thread formats
+them as JSON lines and writes them to stdout. Request handlers therefore never
+wait on stdout, and when the queue is full records are dropped and counted
+rather than stalling the event loop.
+
+Configuration (environment):
+    LOG_LEVEL         default level for the "app" loggers (INFO)
+    LOG_ROUTE_LEVELS  per-route overrides, e.g. "/api/v1/moments=WARNING,/healthz=ERROR"
+                      (longest matching path prefix wins)
+    LOG_SAMPLE_RATE   fraction of DEBUG/INFO records kept (1.0); WARNING and above
+                      are never sampled out
+    LOG_QUEUE_SIZE    maximum number of records waiting to be written (10000)
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from .config import settings
+
+current_route = contextvars.ContextVar("current_route", default=None)
+
+REDACTED = "[REDACTED]"
+SENSITIVE_KEYS = {"password", "hashed_password", "access_token", "token", "authorization", "jwt_secret"}
+
+# Attributes every LogRecord has; anything else was passed through `extra`.
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+def _parse_route_levels(spec: str):
+    levels = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        route, _, level = item.partition("=")
+        levels[route.strip()] = logging.getLevelName(level.strip().upper())
+    # Longest prefix first so the most specific override wins.
+    return sorted(levels.items(), key=lambda item: len(item[0]), reverse=True)
+
+def redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if str(k).lower() in SENSITIVE_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(v) for v in value)
+    return value
+
+class RouteLevelFilter(logging.Filter):
+    def __init__(self, default_level: int, route_levels):
+        super().__init__()
+        self.default_level = default_level
+        self.route_levels = route_levels
+
+    def level_for(self, route):
+        if route:
+            for prefix, level in self.route_levels:
+                if route.startswith(prefix):
+                    return level
+        return self.default_level
+
+    def filter(self, record):
+        route = current_route.get()
+        record.route = route
+        return record.levelno >= self.level_for(route)
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1.0 or random.random() < self.rate
+
+class RedactingFilter(logging.Filter):
+    def filter(self, record):
+        for key, value in list(vars(record).items()):
+            if key in _STANDARD_ATTRS:
+                continue
+            if key.lower() in SENSITIVE_KEYS:
+                setattr(record, key, REDACTED)
+            elif isinstance(value, (dict, list, tuple)):
+                setattr(record, key, redact(value))
+        if isinstance(record.args, dict):
+            record.args = redact(record.args)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when full."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+_listener = None
+
+def setup_logging():
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RouteLevelFilter(
+        logging.getLevelName(settings.LOG_LEVEL.upper()),
+        _parse_route_levels(settings.LOG_ROUTE_LEVELS),
+    ))
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+    queue_handler.addFilter(RedactingFilter())
+
+    app_logger = logging.getLogger("app")
+    # Level filtering happens per route in RouteLevelFilter, so the logger
+    # itself must let everything through that any route might want.
+    route_levels = [level for _, level in _parse_route_levels(settings.LOG_ROUTE_LEVELS)]
+    app_logger.setLevel(min([logging.getLevelName(settings.LOG_LEVEL.upper())] + route_levels))
+    app_logger.addHandler(queue_handler)
+    app_logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+class RouteContextMiddleware:
+    """Pure ASGI middleware that exposes the request path to the log filters."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        token = current_route.set(scope.get("path"))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
@@ -1,37 +1,75 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request, File, UploadFile, Form, WebSocket
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query, File, UploadFile, Form, WebSocket, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
-from .db import ping_db, get_db
-from . import models, auth
-from .background_tasks import generate_weekly_reflections
-from pymongo.mongo_client import MongoClient
-from typing import List
-from .ws_manager import connected_clients
+from .db import get_db, connect_async_db, close_async_db, health_monitor
+from .health import db_circuit
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError
+from .indexes import ensure_indexes
+from .storage import MAX_UPLOAD_REQUEST_BYTES, STATIC_DIR, UploadSizeLimit, save_moment_audio
+from .static_files import CachingStaticFiles, FrontendIndex
+from .logging_config import RouteContextMiddleware, setup_logging
+from .catalog import catalog
+from .http_cache import conditional_json
+from .responses import BSONJSONResponse
+from .search import highlights, search_page, search_terms
+from .export import MEDIA_TYPES, csv_chunks, decode_export_cursor, export_rows, ndjson_chunks
+from .virtues import BUILTIN_VIRTUES, matcher_for
+from .rollups import growth_since, growth_window_start, record_rollups, retag_since, tag_virtues
+from . import config, models, auth
+from . import jobs
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, fetch_page
+from .ws_manager import hub
 from bson import ObjectId
-from datetime import datetime, timedelta
-import random
+from datetime import datetime, timedelta, timezone
+import logging
 import os
 
-from fastapi.staticfiles import StaticFiles
+setup_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    frontend_index.load()
+    db = await connect_async_db()
+
+    async def setup_indexes():
+        await ensure_indexes(db)
+
+    # The unique users.email index backs signup's duplicate check, so keep
+    # retrying until it exists, even if the database was down at boot.
+    health_monitor.when_connected(setup_indexes)
+    if await health_monitor.check():
+        await catalog.load(db)
+    health_monitor.start()
+    catalog.start(db)
+    hub.start(db)
+    auth.password_hasher.start()
+    try:
+        yield
+    finally:
+        auth.password_hasher.shutdown()
+        await hub.stop()
+        await catalog.stop()
+        await health_monitor.stop()
+        close_async_db()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Serve frontend static files
-STATIC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "static"))
 # Correctly determine the frontend directory relative to the backend's app directory
 FRONTEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "dist"))
+frontend_index = FrontendIndex(os.path.join(FRONTEND_DIR, "index.html"))
 
-app.mount("/assets", StaticFiles(directory=os.path.join(FRONTEND_DIR, "assets")), name="assets")
+# Vite content-hashes everything under assets/; see app.static_files.
+app.mount("/assets", CachingStaticFiles(directory=os.path.join(FRONTEND_DIR, "assets"), precompressed=True), name="assets")
 
-@app.get("/{full_path:path}")
-async def serve_frontend(full_path: str, request: Request):
-    file_path = os.path.join(FRONTEND_DIR, "index.html")
-    if os.path.exists(file_path):
-        return FileResponse(file_path)
-    return JSONResponse(status_code=404, content={"message": "Frontend not found"})
-
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+app.mount("/static", CachingStaticFiles(directory=STATIC_DIR, immutable_prefixes=("audio/tts/", "audio/moments/")), name="static")
 
 
 # CORS configuration
@@ -42,23 +80,36 @@ origins = [
     "https://crystal-tiger-blink-backend-a1b2c3d4.snapdev.app",
 ]
 
+# Inside CORS, so browsers can read the 413.
+app.add_middleware(UploadSizeLimit, paths=("/api/v1/moments",), max_bytes=MAX_UPLOAD_REQUEST_BYTES)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+app.add_middleware(RouteContextMiddleware)
+# Negotiated on Accept-Encoding; skips small bodies, audio and already-encoded assets.
+app.add_middleware(GZipMiddleware, minimum_size=config.settings.GZIP_MIN_BYTES, compresslevel=config.settings.GZIP_LEVEL)
+
+MOMENT_PROJECTION = {"userId": 1, "text": 1, "type": 1, "createdAt": 1, "audioUrl": 1}
+FEEDBACK_PROJECTION = {"recipientId": 1, "giverId": 1, "text": 1, "createdAt": 1}
 
 @app.get("/api/v1")
 def read_root():
     return {"message": "Welcome to the Innovation Character API"}
 
+@app.exception_handler(ConnectionFailure)
+async def database_unavailable_handler(request: Request, exc: ConnectionFailure):
+    db_circuit.record_failure()
+    logger.warning("Database request failed", extra={"path": request.url.path, "error": str(exc)})
+    return JSONResponse(status_code=503, content={"detail": "Database unavailable"})
+
 @app.get("/healthz")
-def health_check():
-    if ping_db():
-        return {"status": "ok", "database": "connected"}
-    return {"status": "error", "database": "disconnected"}
+async def health_check():
+    return {**health_monitor.status(), "websockets": hub.stats()}
 
 @app.get("/api/v1/diag")
 def run_diagnostics():
@@ -80,67 +131,66 @@ def run_diagnostics():
         return JSONResponse(status_code=500, content={"status": "error", "detail": str(e)})
 
 @app.post("/api/v1/auth/signup")
-def signup(user: models.UserCreate, db: MongoClient = Depends(get_db)):
-    print(f"--- SIGNUP: Received request for email: {user.email} ---")
-    if db is None:
-        raise HTTPException(status_code=500, detail="Database connection failed")
-    db_user = db.users.find_one({"email": user.email})
+async def signup(user: models.UserCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
+    db_user = await db.users.find_one({"email": user.email})
     if db_user:
-        print(f"--- SIGNUP: User with email {user.email} already exists ---")
+        logger.info("Signup rejected: email already registered")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await auth.password_hasher.hash(user.password)
     user_data = user.model_dump()
     user_data["hashed_password"] = hashed_password
     del user_data["password"]
     user_data["settings"] = {"priorityVirtues": [], "customVirtues": []}
-    
-    print(f"--- SIGNUP: Inserting new user: {user_data} ---")
-    new_user = db.users.insert_one(user_data)
-    print(f"--- SIGNUP: New user inserted with ID: {new_user.inserted_id} ---")
+
+    try:
+        new_user = await db.users.insert_one(user_data)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent signup; the unique email index caught it.
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered",
+        )
+    logger.info("User signed up", extra={"userId": str(new_user.inserted_id)})
     
     access_token = auth.create_access_token(
-        data={"sub": user.email}
+        data={"sub": user.email, "uid": str(new_user.inserted_id)}
     )
     response = JSONResponse(content={"access_token": access_token, "token_type": "bearer"})
     response.set_cookie(key="access_token", value=access_token, httponly=True)
     return response
 
 @app.post("/api/v1/auth/login", response_model=models.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: MongoClient = Depends(get_db)):
-    print(f"--- LOGIN: Attempting to log in user: {form_data.username} ---")
-    if db is None:
-        raise HTTPException(status_code=500, detail="Database connection failed")
-    user = db.users.find_one({"email": form_data.username})
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncIOMotorDatabase = Depends(get_db)):
+    user = await db.users.find_one({"email": form_data.username})
     if not user:
-        print(f"--- LOGIN: User not found: {form_data.username} ---")
+        logger.info("Login failed: unknown user")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    print(f"--- LOGIN: User found: {user} ---")
-    if not auth.verify_password(form_data.password, user["hashed_password"]):
-        print(f"--- LOGIN: Password verification failed for user: {form_data.username} ---")
+
+    if not await auth.password_hasher.verify(form_data.password, user["hashed_password"]):
+        logger.info("Login failed: wrong password", extra={"userId": str(user["_id"])})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    print(f"--- LOGIN: Password verification successful for user: {form_data.username} ---")
+    logger.info("User logged in", extra={"userId": str(user["_id"])})
     access_token = auth.create_access_token(
-        data={"sub": user["email"]}
+        data={"sub": user["email"], "uid": str(user["_id"])}
     )
     response = JSONResponse(content={"access_token": access_token, "token_type": "bearer"})
     response.set_cookie(key="access_token", value=access_token, httponly=True)
     return response
 
 @app.get("/api/v1/auth/me", response_model=models.User)
-def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+async def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
     return current_user
 
 @app.post("/api/v1/auth/logout")
@@ -149,139 +199,188 @@ def logout():
     response.delete_cookie(key="access_token")
     return response
 
+DEFAULT_SETTINGS = {"priorityVirtues": [], "customVirtues": []}
+
+async def user_settings(db: AsyncIOMotorDatabase, user_id: str) -> models.UserSettings:
+    # Read from the database on every use, never from the cached principal:
+    # another worker may have just changed them.
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, {"settings": 1})
+    return models.UserSettings(**((user or {}).get("settings") or DEFAULT_SETTINGS))
+
 @app.get("/api/v1/users/me/settings", response_model=models.UserSettings)
-def get_user_settings(current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    user = db.users.find_one({"email": current_user.email})
-    if user and "settings" in user:
-        return user["settings"]
-    return {"priorityVirtues": [], "customVirtues": []}
+async def get_user_settings(current_user: models.Principal = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    return await user_settings(db, current_user.id)
 
 @app.put("/api/v1/users/me/settings", response_model=models.UserSettings)
-def update_user_settings(settings: models.UserSettings, current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    db.users.update_one(
-        {"email": current_user.email},
-        {"$set": {"settings": settings.model_dump()}}
+async def update_user_settings(settings: models.UserSettings, current_user: models.Principal = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    # The settings being replaced come back from the same write, so the
+    # comparison below cannot miss a change made concurrently elsewhere.
+    previous = await db.users.find_one_and_update(
+        {"_id": ObjectId(current_user.id)},
+        {"$set": {"settings": settings.model_dump()}},
+        projection={"settings": 1},
+        return_document=ReturnDocument.BEFORE,
     )
+    previous_custom = ((previous or {}).get("settings") or DEFAULT_SETTINGS)["customVirtues"]
+    # Moments are tagged when written; bring this week's tags in line with the new list.
+    if matcher_for(settings.customVirtues).names != matcher_for(previous_custom).names:
+        retagged = await retag_since(db, ObjectId(current_user.id), growth_window_start(datetime.utcnow()), settings.customVirtues)
+        logger.info("Custom virtues changed; moments re-tagged", extra={"count": retagged})
     return settings
 
+def as_stored(value: datetime):
+    # MongoDB stores naive UTC datetimes with millisecond precision. Normalise
+    # up front so responses built from the inserted document match what a
+    # later read returns.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+def utcnow():
+    return as_stored(datetime.utcnow())
+
+def moment_response(doc):
+    return models.Moment(
+        id=str(doc["_id"]),
+        userId=str(doc["userId"]),
+        text=doc["text"],
+        type=doc["type"],
+        createdAt=doc["createdAt"],
+        audioUrl=doc.get("audioUrl")
+    )
+
+# List endpoints return their documents as plain dicts through BSONJSONResponse,
+# skipping the response model round trip; keys follow models.Moment / models.PeerFeedback.
+def moment_item(doc, moment_type):
+    return {
+        "text": doc["text"],
+        "type": moment_type,
+        "id": doc["_id"],
+        "userId": doc["userId"],
+        "createdAt": doc["createdAt"],
+        "audioUrl": doc.get("audioUrl"),
+    }
+
+def feedback_item(doc, recipient_email):
+    return {
+        "recipient_email": recipient_email,
+        "text": doc["text"],
+        "id": doc["_id"],
+        "giverId": doc["giverId"],
+        "recipientId": doc["recipientId"],
+        "createdAt": doc["createdAt"],
+    }
+
+def page_response(items, next_cursor):
+    response = BSONJSONResponse(items)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
 @app.post("/api/v1/moments", response_model=models.Moment)
-def create_moment(text: str = Form(...), type: str = Form(...), file: UploadFile = File(None), current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    print(f"--- CREATE_MOMENT: User '{current_user.email}' creating moment of type '{type}' with text: '{text}' ---")
+async def create_moment(text: str = Form(...), type: str = Form(...), file: UploadFile = File(None), current_user: models.Principal = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     audio_url = None
     if file:
-        print(f"--- CREATE_MOMENT: Audio file received: {file.filename} ---")
-        audio_dir = "static/audio/moments"
-        if not os.path.exists(audio_dir):
-            os.makedirs(audio_dir)
-        
-        file_path = os.path.join(audio_dir, file.filename)
-        with open(file_path, "wb") as buffer:
-            buffer.write(file.file.read())
-        audio_url = f"/static/audio/moments/{file.filename}"
-        print(f"--- CREATE_MOMENT: Audio file saved at '{audio_url}' ---")
+        audio_url = await save_moment_audio(file)
+        logger.debug("Moment audio stored", extra={"audioUrl": audio_url})
 
     new_moment = {
         "userId": ObjectId(current_user.id),
         "text": text,
         "type": type,
-        "createdAt": datetime.utcnow(),
+        "createdAt": utcnow(),
         "audioUrl": audio_url
     }
-    print(f"--- CREATE_MOMENT: Inserting into DB: {new_moment} ---")
-    result = db.moments.insert_one(new_moment)
-    print(f"--- CREATE_MOMENT: DB insertion result: {result.inserted_id} ---")
-    created_moment = db.moments.find_one({"_id": result.inserted_id})
-    print(f"--- CREATE_MOMENT: Fetched created moment from DB: {created_moment} ---")
-    
-    response_moment = models.Moment(
-        id=str(created_moment["_id"]),
-        userId=str(created_moment["userId"]),
-        text=created_moment["text"],
-        type=created_moment["type"],
-        createdAt=created_moment["createdAt"],
-        audioUrl=created_moment.get("audioUrl")
+    tag_virtues([new_moment], (await user_settings(db, current_user.id)).customVirtues)
+    # insert_one fills in new_moment["_id"], so the response is built from the
+    # document we just wrote rather than read back.
+    result = await db.moments.insert_one(new_moment)
+    await record_rollups(db, [new_moment])
+    logger.info("Moment created", extra={"momentId": str(result.inserted_id), "type": type})
+    return moment_response(new_moment)
+
+@app.post("/api/v1/moments/batch", response_model=models.MomentBatchResult)
+async def create_moments_batch(batch: models.MomentBatchCreate, current_user: models.Principal = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    user_id = ObjectId(current_user.id)
+    now = utcnow()
+    documents = [
+        {
+            "userId": user_id,
+            "text": item.text,
+            "type": item.type,
+            "createdAt": as_stored(item.createdAt) if item.createdAt else now,
+            "audioUrl": None
+        }
+        for item in batch.moments
+    ]
+    tag_virtues(documents, (await user_settings(db, current_user.id)).customVirtues)
+
+    # Unordered, so one bad document does not stop the rest of the batch.
+    errors = {}
+    try:
+        await db.moments.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+    await record_rollups(db, [document for index, document in enumerate(documents) if index not in errors])
+
+    results = []
+    for index, document in enumerate(documents):
+        if index in errors:
+            results.append(models.MomentBatchItemResult(index=index, status="error", error=errors[index]))
+        else:
+            results.append(models.MomentBatchItemResult(index=index, status="created", moment=moment_response(document)))
+    logger.info("Moment batch stored", extra={"inserted": len(documents) - len(errors), "failed": len(errors)})
+    return models.MomentBatchResult(
+        inserted=len(documents) - len(errors),
+        failed=len(errors),
+        results=results
     )
-    print(f"--- CREATE_MOMENT: Returning response: {response_moment.model_dump_json()} ---")
-    return response_moment
 
 @app.get("/api/v1/moments", response_model=List[models.Moment])
-def get_moments(current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    print(f"--- GET_MOMENTS: Fetching moments for user '{current_user.email}' ---")
-    moments_cursor = db.moments.find({"userId": ObjectId(current_user.id), "type": "moment"}).sort("createdAt", -1)
-    moments = []
-    for moment in moments_cursor:
-        print(f"--- GET_MOMENTS: Processing moment from DB: {moment} ---")
-        moments.append(models.Moment(
-            id=str(moment["_id"]),
-            userId=str(moment["userId"]),
-            text=moment["text"],
-            createdAt=moment["createdAt"],
-            type="moment",
-            audioUrl=moment.get("audioUrl")
-        ))
-    print(f"--- GET_MOMENTS: Found {len(moments)} moments. Returning response. ---")
-    return moments
+async def get_moments(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: models.User = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    page, next_cursor = await fetch_page(db.moments, {"userId": ObjectId(current_user.id), "type": "moment"}, limit, cursor, MOMENT_PROJECTION)
+    logger.debug("Moments page served", extra={"count": len(page)})
+    return page_response([moment_item(moment, "moment") for moment in page], next_cursor)
+
+@app.get("/api/v1/moments/search", response_model=List[models.MomentSearchResult])
+async def search_moments(q: str = Query(..., min_length=1, max_length=200), type: Optional[Literal["moment", "reflection"]] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: models.Principal = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    page, next_cursor = await search_page(db.moments, ObjectId(current_user.id), q, limit, cursor, type, MOMENT_PROJECTION)
+    terms = search_terms(q)
+    results = [
+        {**moment_item(doc, doc["type"]), "score": doc["score"], "highlights": highlights(doc["text"], terms)}
+        for doc in page
+    ]
+    logger.debug("Moment search served", extra={"count": len(results)})
+    return page_response(results, next_cursor)
 
 @app.get("/api/v1/reflections", response_model=List[models.Moment])
-def get_reflections(current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    print(f"--- GET_REFLECTIONS: Fetching reflections for user '{current_user.email}' ---")
-    reflections_cursor = db.moments.find({"userId": ObjectId(current_user.id), "type": "reflection"}).sort("createdAt", -1)
-    reflections = []
-    for reflection in reflections_cursor:
-        print(f"--- GET_REFLECTIONS: Processing reflection from DB: {reflection} ---")
-        reflections.append(models.Moment(
-            id=str(reflection["_id"]),
-            userId=str(reflection["userId"]),
-            text=reflection["text"],
-            createdAt=reflection["createdAt"],
-            type="reflection",
-            audioUrl=reflection.get("audioUrl")
-        ))
-    print(f"--- GET_REFLECTIONS: Found {len(reflections)} reflections. Returning response. ---")
-    return reflections
+async def get_reflections(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: models.User = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    page, next_cursor = await fetch_page(db.moments, {"userId": ObjectId(current_user.id), "type": "reflection"}, limit, cursor, MOMENT_PROJECTION)
+    logger.debug("Reflections page served", extra={"count": len(page)})
+    return page_response([moment_item(reflection, "reflection") for reflection in page], next_cursor)
 
 @app.post("/api/v1/reflections", response_model=models.Moment)
-def create_reflection(moment: models.MomentCreate, current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    print(f"--- CREATE_REFLECTION: User '{current_user.email}' creating reflection with text: '{moment.text}' ---")
+async def create_reflection(moment: models.MomentCreate, current_user: models.Principal = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     new_moment = {
         "userId": ObjectId(current_user.id),
         "text": moment.text,
         "type": "reflection",
-        "createdAt": datetime.utcnow()
+        "createdAt": utcnow()
     }
-    print(f"--- CREATE_REFLECTION: Inserting into DB: {new_moment} ---")
-    result = db.moments.insert_one(new_moment)
-    print(f"--- CREATE_REFLECTION: DB insertion result: {result.inserted_id} ---")
-    created_moment = db.moments.find_one({"_id": result.inserted_id})
-    print(f"--- CREATE_REFLECTION: Fetched created reflection from DB: {created_moment} ---")
-    
-    response_moment = models.Moment(
-        id=str(created_moment["_id"]),
-        userId=str(created_moment["userId"]),
-        text=created_moment["text"],
-        type=created_moment["type"],
-        createdAt=created_moment["createdAt"]
-    )
-    print(f"--- CREATE_REFLECTION: Returning response: {response_moment.model_dump_json()} ---")
-    return response_moment
+    tag_virtues([new_moment], (await user_settings(db, current_user.id)).customVirtues)
+    result = await db.moments.insert_one(new_moment)
+    await record_rollups(db, [new_moment])
+    logger.info("Reflection created", extra={"momentId": str(result.inserted_id)})
+    return moment_response(new_moment)
 
 @app.get("/api/v1/peer-feedback", response_model=List[models.PeerFeedback])
-def get_peer_feedback(current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    feedback_cursor = db.peer_feedback.find({"recipientId": ObjectId(current_user.id)})
-    feedback_list = []
-    for feedback in feedback_cursor:
-        feedback_list.append(models.PeerFeedback(
-            id=str(feedback["_id"]),
-            recipientId=str(feedback["recipientId"]),
-            giverId=str(feedback["giverId"]),
-            text=feedback["text"],
-            createdAt=feedback["createdAt"]
-        ))
-    return feedback_list
+async def get_peer_feedback(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: models.User = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    page, next_cursor = await fetch_page(db.peer_feedback, {"recipientId": ObjectId(current_user.id)}, limit, cursor, FEEDBACK_PROJECTION)
+    return page_response([feedback_item(feedback, current_user.email) for feedback in page], next_cursor)
 
 @app.post("/api/v1/peer-feedback", response_model=models.PeerFeedback)
-def create_peer_feedback(feedback: models.PeerFeedbackCreate, current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    recipient = db.users.find_one({"email": feedback.recipient_email})
+async def create_peer_feedback(feedback: models.PeerFeedbackCreate, current_user: models.User = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    recipient = await db.users.find_one({"email": feedback.recipient_email})
     if not recipient:
         raise HTTPException(status_code=404, detail="Recipient not found")
 
@@ -289,39 +388,37 @@ def create_peer_feedback(feedback: models.PeerFeedbackCreate, current_user: mode
         "recipientId": recipient["_id"],
         "giverId": ObjectId(current_user.id),
         "text": feedback.text,
-        "createdAt": datetime.utcnow()
+        "createdAt": utcnow()
     }
-    result = db.peer_feedback.insert_one(new_feedback)
-    created_feedback = db.peer_feedback.find_one({"_id": result.inserted_id})
+    await db.peer_feedback.insert_one(new_feedback)
 
     return models.PeerFeedback(
-        id=str(created_feedback["_id"]),
-        recipientId=str(created_feedback["recipientId"]),
-        giverId=str(created_feedback["giverId"]),
-        text=created_feedback["text"],
-        createdAt=created_feedback["createdAt"],
+        id=str(new_feedback["_id"]),
+        recipientId=str(new_feedback["recipientId"]),
+        giverId=str(new_feedback["giverId"]),
+        text=new_feedback["text"],
+        createdAt=new_feedback["createdAt"],
         recipient_email=feedback.recipient_email
     )
 
-from fastapi.responses import JSONResponse
-
 @app.get("/api/v1/dashboard", response_model=models.DashboardData)
-def get_dashboard_data(current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    print(f"--- DASHBOARD: Endpoint called for user '{current_user.email}' ---")
+async def get_dashboard_data(request: Request, current_user: models.User = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     # --- Growth Trends Calculation ---
     now = datetime.utcnow()
     start_of_this_week = now - timedelta(days=now.weekday())
     start_of_last_week = start_of_this_week - timedelta(days=7)
 
-    moments_this_week = db.moments.count_documents({
-        "userId": ObjectId(current_user.id),
-        "createdAt": {"$gte": start_of_this_week}
-    })
-
-    moments_last_week = db.moments.count_documents({
-        "userId": ObjectId(current_user.id),
-        "createdAt": {"$gte": start_of_last_week, "$lt": start_of_this_week}
-    })
+    # Both weekly counts in a single round trip.
+    counts = await db.moments.aggregate([
+        {"$match": {"userId": ObjectId(current_user.id), "createdAt": {"$gte": start_of_last_week}}},
+        {"$group": {
+            "_id": None,
+            "thisWeek": {"$sum": {"$cond": [{"$gte": ["$createdAt", start_of_this_week]}, 1, 0]}},
+            "lastWeek": {"$sum": {"$cond": [{"$lt": ["$createdAt", start_of_this_week]}, 1, 0]}},
+        }},
+    ]).to_list(length=1)
+    moments_this_week = counts[0]["thisWeek"] if counts else 0
+    moments_last_week = counts[0]["lastWeek"] if counts else 0
 
     if moments_this_week > moments_last_week:
         week_summary = f"Great job! You've logged {moments_this_week} moments this week, which is more than last week."
@@ -334,20 +431,19 @@ def get_dashboard_data(current_user: models.User = Depends(auth.get_current_user
     }
     # --- End Growth Trends Calculation ---
 
-    # Fetch a random quote using an aggregation pipeline
-    pipeline = [{ "$sample": { "size": 1 } }]
-    quote_cursor = db.quotes.aggregate(pipeline)
-    
-    try:
-        random_quote = next(quote_cursor)
+    # Quotes and articles come from the in-process catalog, not the database.
+    # The pick is fixed per user per day so the response stays cacheable.
+    daily_seed = f"{current_user.id}:{now.date().isoformat()}"
+    daily_quote = catalog.daily_quote(daily_seed)
+    if daily_quote:
         daily_quote_data = {
-            "quote": random_quote["quote"],
-            "author": random_quote["author"],
+            "quote": daily_quote["quote"],
+            "author": daily_quote["author"],
             "reflectionPrompt": "How can you apply this wisdom to your work today?"
         }
-    except StopIteration:
+    else:
         # Fallback if the quotes collection is empty
-        print("--- DASHBOARD: No quotes found in DB, using fallback. ---")
+        logger.info("No quotes found, using fallback")
         daily_quote_data = {
             "quote": "Welcome! The journey of a thousand miles begins with a single step.",
             "author": "Lao Tzu",
@@ -355,11 +451,7 @@ def get_dashboard_data(current_user: models.User = Depends(auth.get_current_user
         }
 
     # --- Fetch News Articles ---
-    print("--- DASHBOARD: Fetching news articles ---")
-    articles_pipeline = [{ "$sample": { "size": 2 } }]
-    articles_cursor = db.articles.aggregate(articles_pipeline)
-    articles = list(articles_cursor)
-    print(f"--- DASHBOARD: Found {len(articles)} articles in DB ---")
+    articles = catalog.daily_articles(daily_seed, 2)
 
     news_articles_data = [
         {
@@ -372,7 +464,7 @@ def get_dashboard_data(current_user: models.User = Depends(auth.get_current_user
 
     if not news_articles_data:
         # Fallback if the articles collection is empty
-        print("--- DASHBOARD: No articles found in DB, using fallback. ---")
+        logger.info("No articles found, using fallback")
         news_articles_data = [
             {
                 "id": "default1",
@@ -381,47 +473,50 @@ def get_dashboard_data(current_user: models.User = Depends(auth.get_current_user
                 "link": "#"
             }
         ]
-    print(f"--- DASHBOARD: Processed news articles data: {news_articles_data} ---")
     
-    response_data = models.DashboardData(
-        dailyQuote=daily_quote_data,
-        newsArticles=news_articles_data,
-        growthTrends=growth_trends,
-    )
-    print(f"--- DASHBOARD: Sending response data: {response_data.model_dump_json()} ---")
-    
-    # Return a JSONResponse with cache-control headers to prevent caching
-    return JSONResponse(
-        content=response_data.model_dump(),
-        headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"}
-    )
+    # Already in the shape of models.DashboardData.
+    response_data = {
+        "dailyQuote": daily_quote_data,
+        "newsArticles": news_articles_data,
+        "growthTrends": growth_trends,
+    }
+
+    # Strong ETag over the body; repeat loads with If-None-Match get a 304.
+    return conditional_json(request, response_data)
 
 @app.get("/api/v1/articles", response_model=List[models.NewsArticle])
-def get_all_articles(db: MongoClient = Depends(get_db)):
-    articles_cursor = db.articles.find()
-    articles = list(articles_cursor)
-    for article in articles:
-        article['id'] = str(article['_id'])
-    return articles
+async def get_all_articles():
+    return BSONJSONResponse([
+        {"id": article["_id"], "title": article["title"], "summary": article["summary"], "link": article["link"]}
+        for article in catalog.all_articles()
+    ])
+
+@app.get("/api/v1/export")
+async def export_history(format: Literal["ndjson", "csv"] = "ndjson", cursor: Optional[str] = None, current_user: models.Principal = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    # Rejected up front: once streaming has started the status can no longer change.
+    resume = decode_export_cursor(cursor) if cursor else None
+    logger.info("Export started", extra={"format": format, "resumed": resume is not None})
+    batches = export_rows(db, ObjectId(current_user.id), resume)
+    chunks = ndjson_chunks(batches) if format == "ndjson" else csv_chunks(batches)
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format], headers={
+        "Content-Disposition": f'attachment; filename="export.{format}"',
+        "Cache-Control": "no-store",
+    })
 
 @app.get("/api/v1/reflections/weekly", response_model=models.WeeklyReflectionData)
-def get_weekly_reflection(current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    reflection = db.weekly_reflections.find_one(
+async def get_weekly_reflection(current_user: models.Principal = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    reflection = await db.weekly_reflections.find_one(
         {"userId": ObjectId(current_user.id)},
         sort=[("generatedAt", -1)]
     )
 
+    # The week's moment and virtue counts, from at most seven daily rollups.
+    matcher = matcher_for((await user_settings(db, current_user.id)).customVirtues)
+    moment_count, virtue_counts = await growth_since(
+        db, ObjectId(current_user.id), growth_window_start(datetime.utcnow()), matcher.names
+    )
+
     if reflection:
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        moments_cursor = db.moments.find({
-            "userId": ObjectId(current_user.id),
-            "createdAt": {"$gte": seven_days_ago}
-        })
-        moment_count = db.moments.count_documents({
-            "userId": ObjectId(current_user.id),
-            "createdAt": {"$gte": seven_days_ago}
-        })
-        
         audio_summary_text = f"You've logged {moment_count} moments in the past week. Keep it up!"
         number_of_moments = moment_count
     else:
@@ -435,22 +530,13 @@ def get_weekly_reflection(current_user: models.User = Depends(auth.get_current_u
         "audioUrl": f"http://localhost:8001{reflection['audioUrl']}" if reflection and 'audioUrl' in reflection else None,
     }
 
-    # Fetch calendar insights from the database
-    insights_cursor = db.calendar_insights.find()
-    insights = [item['insight'] for item in insights_cursor]
-    calendar_insights = random.sample(insights, 2) if len(insights) >= 2 else insights
+    # Calendar insights and the virtue suggestion come from the in-process catalog.
+    calendar_insights = catalog.random_insights(2)
     if not calendar_insights:
         calendar_insights = ["No calendar insights available yet."]
 
-    # Fetch a random virtue suggestion from the database
-    # Fetch a random virtue suggestion using an aggregation pipeline
-    pipeline = [{ "$sample": { "size": 1 } }]
-    suggestion_cursor = db.reflection_suggestions.aggregate(pipeline)
-    
-    try:
-        virtue_suggestion = next(suggestion_cursor)
-        virtue_suggestion['_id'] = str(virtue_suggestion['_id'])
-    except StopIteration:
+    virtue_suggestion = catalog.random_suggestion()
+    if not virtue_suggestion:
         # Handle the case where the collection is empty
         virtue_suggestion = {
             "virtue": "Kindness",
@@ -458,32 +544,12 @@ def get_weekly_reflection(current_user: models.User = Depends(auth.get_current_u
         }
 
     # --- Dynamic Growth Data Calculation ---
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    moments_cursor = db.moments.find({
-        "userId": ObjectId(current_user.id),
-        "createdAt": {"$gte": seven_days_ago}
-    })
-    
-    resilience_count = 0
-    empathy_count = 0
-    grit_count = 0
-    
-    for moment in moments_cursor:
-        text = moment.get("text", "").lower()
-        if "resilience" in text or "strong" in text or "overcame" in text:
-            resilience_count += 1
-        if "empathy" in text or "understanding" in text or "compassion" in text:
-            empathy_count += 1
-        if "grit" in text or "perseverance" in text or "persistent" in text:
-            grit_count += 1
-            
     growth_data = [
         {
             "name": "This Week",
             "Moments": number_of_moments,
-            "Resilience": resilience_count,
-            "Empathy": empathy_count,
-            "Grit": grit_count,
+            **{name: count for name, count in virtue_counts.items() if name in BUILTIN_VIRTUES},
+            "customVirtues": {name: count for name, count in virtue_counts.items() if name not in BUILTIN_VIRTUES},
         }
     ]
 
@@ -495,8 +561,8 @@ def get_weekly_reflection(current_user: models.User = Depends(auth.get_current_u
     }
 
 @app.get("/api/v1/integrations", response_model=models.Integrations)
-def get_integrations(current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    integrations = db.integrations.find_one({"userId": ObjectId(current_user.id)})
+async def get_integrations(current_user: models.User = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    integrations = await db.integrations.find_one({"userId": ObjectId(current_user.id)})
     if integrations:
         return models.Integrations(
             email=integrations.get("email", {"connected": False, "settings": {}}),
@@ -510,27 +576,60 @@ def get_integrations(current_user: models.User = Depends(auth.get_current_user),
     )
 
 @app.put("/api/v1/integrations", response_model=models.Integrations)
-def update_integrations(integrations: models.Integrations, current_user: models.User = Depends(auth.get_current_user), db: MongoClient = Depends(get_db)):
-    db.integrations.update_one(
+async def update_integrations(integrations: models.Integrations, current_user: models.User = Depends(auth.get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    await db.integrations.update_one(
         {"userId": ObjectId(current_user.id)},
         {"$set": integrations.model_dump()},
         upsert=True
     )
     return integrations
 
-@app.post("/api/v1/tasks/generate-reflections")
-def trigger_generate_reflections():
-    generate_weekly_reflections()
-    return {"message": "Weekly reflections generation started."}
+@app.post("/api/v1/tasks/generate-reflections", response_model=models.TaskStatus, status_code=status.HTTP_202_ACCEPTED)
+async def trigger_generate_reflections(response: Response, idempotency_key: Optional[str] = Header(None), db: AsyncIOMotorDatabase = Depends(get_db)):
+    # Only queues the job; worker.py runs it. A run already queued or in
+    # progress is returned instead of starting a second one.
+    job, created = await jobs.enqueue(db, jobs.GENERATE_REFLECTIONS, idempotency_key)
+    response.headers["Location"] = f"/api/v1/tasks/{job['_id']}"
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return jobs.job_response(job)
+
+@app.get("/api/v1/tasks/{task_id}", response_model=models.TaskStatus)
+async def get_task_status(task_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
+    return jobs.job_response(await jobs.get_job(db, task_id))
 
 
 @app.websocket("/ws/reflections")
 async def websocket_endpoint(websocket: WebSocket):
+    overload = hub.overloaded()
+    if overload:
+        await hub.shed_connection(websocket, overload)
+        return
+    try:
+        db = await get_db()
+        principal = await auth.principal_from_token(db, auth.websocket_token(websocket, origins) or "")
+    except HTTPException as e:
+        unavailable = e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER if unavailable else status.WS_1008_POLICY_VIOLATION)
+        return
+
     await websocket.accept()
-    connected_clients.add(websocket)
+    # Only this user's messages are delivered here; see ws_manager.
+    connection = hub.connect(principal.id, websocket)
     try:
         while True:
-            # Keep the connection alive
-            await websocket.receive_text()
-    except Exception:
-        connected_clients.remove(websocket)
+            # Pongs and anything else the client sends mark it as alive.
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            connection.seen(len(message.get("text") or message.get("bytes") or ""))
+    finally:
+        hub.disconnect(connection)
+
+# The SPA catch-all must be registered last, otherwise it shadows every GET
+# API route declared after it.
+@app.get("/{full_path:path}")
+async def serve_frontend(full_path: str, request: Request):
+    if frontend_index.loaded:
+        return frontend_index.response(request)
+    return JSONResponse(status_code=404, content={"message": "Frontend not found"})
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -22,6 +22,12 @@ class UserSettings(BaseModel):
     priorityVirtues: List[str]
     customVirtues: List[str]
 
+class Principal(User):
+    """
+    The authenticated user as resolved by auth.get_current_user. Identity
+    only: settings can change through any worker, so they are read per request.
+    """
+
 class MomentCreate(BaseModel):
     text: str
     type: str
@@ -35,6 +41,29 @@ class Moment(MomentCreate):
     class Config:
         from_attributes = True
 
+class MomentSearchResult(Moment):
+    score: float
+    # [start, end) character offsets of the matched words in `text`.
+    highlights: List[List[int]]
+
+class MomentBatchItem(MomentCreate):
+    # Offline clients and importers may supply the original capture time.
+    createdAt: Optional[datetime] = None
+
+class MomentBatchCreate(BaseModel):
+    moments: List[MomentBatchItem] = Field(..., min_length=1, max_length=500)
+
+class MomentBatchItemResult(BaseModel):
+    index: int
+    status: str
+    moment: Optional[Moment] = None
+    error: Optional[str] = None
+
+class MomentBatchResult(BaseModel):
+    inserted: int
+    failed: int
+    results: List[MomentBatchItemResult]
+
 class DailyQuote(BaseModel):
     quote: str
     author: str
@@ -70,6 +99,9 @@ class GrowthDataPoint(BaseModel):
     Resilience: Optional[int] = None
     Empathy: Optional[int] = None
     Grit: Optional[int] = None
+    # Keyed by the user's own virtue names, which are free text and so kept
+    # apart from the fixed fields above.
+    customVirtues: Dict[str, int] = {}
 
 class WeeklyReflectionData(BaseModel):
     audioSummary: AudioSummary
@@ -97,4 +129,15 @@ class PeerFeedback(PeerFeedbackCreate):
     createdAt: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TaskStatus(BaseModel):
+    id: str
+    type: str
+    status: str
+    createdAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
+    progress: dict = {}
+    result: Optional[dict] = None
+    error: Optional[str] = None
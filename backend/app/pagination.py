@@ -0,0 +1,56 @@
+"""
+Keyset pagination over (createdAt, _id).
+
+Cursors are opaque to clients: a url-safe base64 encoding of the last item's
+createdAt and _id. Each page is fetched with a range predicate on the sort key
+instead of skip(), so the cost of a page does not depend on how deep into the
+history it is, as long as the query is backed by an index ending in
+(createdAt, _id). The cursor helpers take another timestamp field where a
+collection is ordered by one (weekly reflections by generatedAt).
+"""
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+from pymongo import DESCENDING
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+SORT = [("createdAt", DESCENDING), ("_id", DESCENDING)]
+
+def encode_cursor(doc, field: str = "createdAt"):
+    payload = json.dumps({"t": doc[field].isoformat(), "id": str(doc["_id"])}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def after_cursor(query: dict, cursor: str = None, field: str = "createdAt"):
+    """Returns `query` restricted to items that sort after `cursor` in (field, _id) order."""
+    if not cursor:
+        return query
+    created_at, last_id = decode_cursor(cursor)
+    return {
+        **query,
+        "$or": [
+            {field: {"$lt": created_at}},
+            {field: created_at, "_id": {"$lt": last_id}},
+        ],
+    }
+
+async def fetch_page(collection, query: dict, limit: int, cursor: str = None, projection: dict = None):
+    """Returns (documents, next_cursor); next_cursor is None on the last page."""
+    docs = await collection.find(after_cursor(query, cursor), projection).sort(SORT).limit(limit + 1).to_list(length=limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1])
+    return docs, None
@@ -0,0 +1,25 @@
+"""
+bcrypt helpers. Kept free of app imports so that the password worker processes
+(see auth.PasswordHasher) only need passlib to start.
+"""
+import logging
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__ident="2b")
+
+
+def verify_password(plain_password, hashed_password):
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except Exception as e:
+        logger.warning("Password verification error", extra={"error": str(e)})
+        return False
+
+def get_password_hash(password):
+    try:
+        return pwd_context.hash(password)
+    except Exception:
+        logger.exception("Password hashing failed")
+        raise
@@ -0,0 +1,32 @@
+"""
+Fast JSON responses for documents read straight from MongoDB.
+
+BSONJSONResponse renders with orjson. ObjectIds become strings and datetimes
+ISO 8601 strings, which is the JSON the Pydantic response models produce for
+the same fields.
+
+List endpoints build plain dicts from their projected documents and return
+this response themselves. FastAPI passes a returned Response through
+untouched, so the response_model still documents the endpoint but no longer
+re-validates and re-encodes every item: each document is converted once,
+not built as a model, validated again and encoded by the stdlib json module.
+"""
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    # OPT_UTC_Z: aware UTC datetimes end in "Z", as Pydantic writes them.
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+class BSONJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,148 @@
+"""
+Write-time virtue tagging and per-user daily rollups.
+
+Every moment is tagged with the virtues it mentions when it is inserted
+(`virtues` on the moment document), and a `daily_rollups` document per
+(userId, day) is kept current with `$inc` upserts:
+
+    {"userId": ..., "day": <UTC midnight>, "count": 5,
+     "types": {"moment": 4, "reflection": 1},
+     "virtues": {"Resilience": 2, "Grit": 1},
+     "terms": {"deadline": 3, "family": 1}}
+
+Growth charts then read at most a handful of small rollup documents instead
+of re-scanning and re-parsing a week of moment text; the reflection engine
+reads `terms` the same way (see app.terms). The moment insert and the rollup
+updates are separate writes; backfill_rollups.py rebuilds both from
+the moments collection if they ever drift.
+
+Tags follow the custom virtues the user had when the moment was written.
+When they change their custom virtues, retag_since() re-tags the current
+growth window so this week's chart counts the new list. Older days keep their
+tags until backfill_rollups.py is run for the user.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+from pymongo import UpdateOne
+from .terms import DOCUMENTS_KEY, TERM_DF_COLLECTION, term_counts
+from .virtues import matcher_for
+
+ROLLUP_COLLECTION = "daily_rollups"
+
+
+def day_of(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+def virtue_field(name: str) -> str:
+    # Custom virtue names are user input; keep them usable as field names.
+    return name.replace(".", "_").lstrip("$") or "_"
+
+
+def tag_virtues(documents: Iterable[dict], custom_virtues: Iterable[str] = ()) -> None:
+    """Sets `virtues` on each moment document in place."""
+    matcher = matcher_for(custom_virtues)
+    for document in documents:
+        document["virtues"] = sorted(matcher.classify(document.get("text", "")))
+
+
+def rollup_increments(documents: Iterable[dict]) -> Dict[Tuple, Counter]:
+    """Groups tagged moments into `$inc` counters keyed by (userId, day)."""
+    increments = defaultdict(Counter)
+    for document in documents:
+        counter = increments[(document["userId"], day_of(document["createdAt"]))]
+        counter["count"] += 1
+        counter[f"types.{document.get('type', 'moment')}"] += 1
+        for name in document.get("virtues", ()):
+            counter[f"virtues.{virtue_field(name)}"] += 1
+        for term, count in term_counts(document.get("text", "")).items():
+            counter[f"terms.{term}"] += count
+    return increments
+
+
+def increment_updates(increments: Dict[Tuple, Counter]) -> List[UpdateOne]:
+    return [
+        UpdateOne({"userId": user_id, "day": day}, {"$inc": dict(counter)}, upsert=True)
+        for (user_id, day), counter in increments.items()
+    ]
+
+
+def rollup_updates(documents: Iterable[dict]) -> List[UpdateOne]:
+    return increment_updates(rollup_increments(documents))
+
+
+def document_frequencies(documents: Iterable[dict]) -> Counter:
+    """Moments containing each term, plus the number of moments under DOCUMENTS_KEY."""
+    frequencies = Counter()
+    for document in documents:
+        frequencies[DOCUMENTS_KEY] += 1
+        frequencies.update(term_counts(document.get("text", "")).keys())
+    return frequencies
+
+
+def document_frequency_updates(frequencies: Counter) -> List[UpdateOne]:
+    return [
+        UpdateOne({"_id": term}, {"$inc": {"df": count}}, upsert=True)
+        for term, count in frequencies.items()
+    ]
+
+
+async def record_rollups(db, documents: Iterable[dict]) -> None:
+    """Adds freshly inserted, tagged moments to their users' daily rollups and the term_df table."""
+    documents = list(documents)
+    updates = rollup_updates(documents)
+    if updates:
+        await db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+    df_updates = document_frequency_updates(document_frequencies(documents))
+    if df_updates:
+        await db[TERM_DF_COLLECTION].bulk_write(df_updates, ordered=False)
+
+
+async def growth_since(db, user_id, since: datetime, virtue_names: Iterable[str]) -> Tuple[int, Dict[str, int]]:
+    """
+    Sums the rollups from `since`'s day onwards. Returns the moment count and
+    a count per name in `virtue_names` (zero if never seen).
+    """
+    cursor = db[ROLLUP_COLLECTION].find(
+        {"userId": user_id, "day": {"$gte": day_of(since)}},
+        {"count": 1, "virtues": 1},
+    )
+    total = 0
+    virtues = Counter()
+    async for rollup in cursor:
+        total += rollup.get("count", 0)
+        virtues.update(rollup.get("virtues", {}))
+    return total, {name: virtues.get(virtue_field(name), 0) for name in virtue_names}
+
+
+async def retag_since(db, user_id, since: datetime, custom_virtues: Iterable[str]) -> int:
+    """
+    Re-tags the user's moments from `since`'s day onwards and rewrites the
+    `virtues` of those days' rollups; counts and terms are left alone.
+    Returns the number of moments re-tagged. Like the backfill, a moment
+    written meanwhile can be miscounted in its day's virtues.
+    """
+    matcher = matcher_for(custom_virtues)
+    start = day_of(since)
+    virtues_by_day = defaultdict(Counter)
+    moment_updates = []
+    async for moment in db.moments.find({"userId": user_id, "createdAt": {"$gte": start}}, {"text": 1, "createdAt": 1}):
+        virtues = sorted(matcher.classify(moment.get("text", "")))
+        moment_updates.append(UpdateOne({"_id": moment["_id"]}, {"$set": {"virtues": virtues}}))
+        virtues_by_day[day_of(moment["createdAt"])].update(virtue_field(name) for name in virtues)
+    if moment_updates:
+        await db.moments.bulk_write(moment_updates, ordered=False)
+
+    days = {start + timedelta(days=offset) for offset in range((day_of(datetime.utcnow()) - start).days + 1)}
+    days.update(virtues_by_day)
+    await db[ROLLUP_COLLECTION].bulk_write([
+        UpdateOne({"userId": user_id, "day": day}, {"$set": {"virtues": dict(virtues_by_day.get(day, {}))}})
+        for day in sorted(days)
+    ], ordered=False)
+    return len(moment_updates)
+
+
+def growth_window_start(now: datetime) -> datetime:
+    """First day of the 7-day window that ends today."""
+    return day_of(now) - timedelta(days=6)
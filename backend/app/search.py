@@ -0,0 +1,89 @@
+"""
+Per-user full-text search over moments and reflections.
+
+Backed by the compound text index userId_text ({userId: 1, text: "text"}, see
+app.indexes): the equality on userId is part of the index key, so a search
+only reads the user's own index entries, not every moment that matches.
+
+Results are ranked by MongoDB's text score, ties broken by _id (newest
+first). Pages are keyset on (score, _id): like app.pagination the cursor is
+an opaque url-safe base64 token, and new writes never shift later pages.
+
+Highlights are [start, end) character offsets of the words in `text` that
+match a search term. The text index stems words (English), so matching here
+compares crudely stemmed words too; it marks what the index matched in all
+but unusual cases.
+"""
+import base64
+import json
+import re
+from typing import List, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+from .terms import STOPWORDS
+
+_WORD = re.compile(r"\w+")
+_SUFFIXES = ("ing", "ed", "es", "ly", "s")
+
+
+def stem(word: str) -> str:
+    word = word.lower()
+    for suffix in _SUFFIXES:
+        if len(word) - len(suffix) >= 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def search_terms(q: str) -> set:
+    """Stems of the words in `q` the text index searches for (negated words and stopwords dropped)."""
+    terms = set()
+    for token in q.split():
+        if token.startswith("-"):
+            continue
+        terms.update(stem(word) for word in _WORD.findall(token.lower()) if word not in STOPWORDS)
+    return terms
+
+
+def highlights(text: str, terms: set) -> List[List[int]]:
+    return [[match.start(), match.end()] for match in _WORD.finditer(text) if stem(match.group()) in terms]
+
+
+def encode_search_cursor(doc) -> str:
+    payload = json.dumps({"s": doc["score"], "id": str(doc["_id"])}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(payload["s"]), ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def search_pipeline(user_id: ObjectId, q: str, limit: int, cursor: str = None, moment_type: Optional[str] = None, projection: dict = None) -> list:
+    """Aggregation for one page of matches, `limit` + 1 long so the caller can tell whether another page follows."""
+    # $text has to be in the first stage.
+    match = {"userId": user_id, "$text": {"$search": q}}
+    if moment_type:
+        match["type"] = moment_type
+    pipeline = [{"$match": match}, {"$addFields": {"score": {"$meta": "textScore"}}}]
+    if cursor:
+        score, last_id = decode_search_cursor(cursor)
+        pipeline.append({"$match": {"$or": [{"score": {"$lt": score}}, {"score": score, "_id": {"$lt": last_id}}]}})
+    pipeline.append({"$sort": {"score": -1, "_id": -1}})
+    pipeline.append({"$limit": limit + 1})
+    if projection:
+        pipeline.append({"$project": {**projection, "score": 1}})
+    return pipeline
+
+
+async def search_page(collection, user_id: ObjectId, q: str, limit: int, cursor: str = None, moment_type: Optional[str] = None, projection: dict = None):
+    """Returns (documents with their "score", next_cursor); next_cursor is None on the last page."""
+    docs = await collection.aggregate(search_pipeline(user_id, q, limit, cursor, moment_type, projection)).to_list(length=limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_search_cursor(docs[-1])
+    return docs, None
@@ -0,0 +1,170 @@
+"""
+Frontend and static file serving.
+
+* index.html is read once at startup and kept in memory with a strong ETag
+  and its compressed encodings. Navigations revalidate it (no-cache), so a
+  new deploy is picked up straight away and an unchanged page costs a 304.
+* /assets holds Vite's content-hashed bundles: they never change under the
+  same name, so they are served as immutable for a year. precompress_assets.py
+  writes .br/.gz siblings after each build and the best one the client
+  accepts is sent as is; nothing is compressed per request.
+* /static/audio is served by Starlette's FileResponse, which answers Range
+  requests (seeking in an audio player). Content-addressed audio (tts/ and
+  moments/) is immutable too.
+
+brotli is optional: without it only gzip variants are made and served.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+from typing import Dict, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+from .http_cache import etag_matches, strong_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Preferred first.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def available_encodings() -> Tuple[Tuple[str, str], ...]:
+    return tuple((encoding, suffix) for encoding, suffix in ENCODINGS if encoding != "br" or brotli is not None)
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> set:
+    """Content codings the client accepts (q > 0), e.g. {"br", "gzip"}."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding == "*":
+            accepted.update(encoding for encoding, _ in ENCODINGS)
+        elif coding:
+            accepted.add(coding)
+    return accepted
+
+
+class FrontendIndex:
+    """The SPA's index.html, held in memory for the catch-all route."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.etag = None
+        self._bodies: Dict[str, bytes] = {}
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as index:
+                body = index.read()
+        except FileNotFoundError:
+            logger.warning("Frontend index.html not found", extra={"path": self.path})
+            self.etag, self._bodies = None, {}
+            return
+        self.etag = strong_etag(body)
+        self._bodies = {"identity": body}
+        for encoding, _ in available_encodings():
+            compressed = compress(body, encoding)
+            if len(compressed) < len(body):
+                self._bodies[encoding] = compressed
+
+    @property
+    def loaded(self) -> bool:
+        return self.etag is not None
+
+    def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self._bodies:
+                headers["Content-Encoding"] = encoding
+                return Response(self._bodies[encoding], media_type="text/html", headers=headers)
+        return Response(self._bodies["identity"], media_type="text/html", headers=headers)
+
+
+class CachingStaticFiles(StaticFiles):
+    """
+    StaticFiles that sets Cache-Control and can serve precompressed siblings.
+
+    `immutable_prefixes`: paths (relative to `directory`) under which files
+    never change, so clients may cache them for a year without revalidating.
+    `precompressed`: look for `<file>.br` / `<file>.gz` next to each file.
+    """
+
+    def __init__(self, *, directory: str, immutable_prefixes: Iterable[str] = ("",), precompressed: bool = False, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.immutable_prefixes = tuple(immutable_prefixes)
+        self.precompressed = precompressed
+        # Variants found for immutable files never change either, so those
+        # lookups are kept. A miss is not: the variant may be written later.
+        self._variants: Dict[str, Tuple] = {}
+
+    def _relative(self, full_path) -> str:
+        return os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+
+    def _variants_of(self, full_path: str, immutable: bool):
+        variants = self._variants.get(full_path)
+        if variants is None:
+            variants = []
+            for encoding, suffix in ENCODINGS:
+                try:
+                    variants.append((encoding, full_path + suffix, os.stat(full_path + suffix)))
+                except OSError:
+                    pass
+            variants = tuple(variants)
+            if immutable and variants:
+                self._variants[full_path] = variants
+        return variants
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        relative = self._relative(full_path)
+        immutable = relative.startswith(self.immutable_prefixes)
+
+        response = None
+        if self.precompressed:
+            variants = self._variants_of(str(full_path), immutable)
+            accepted = accepted_encodings(request_headers.get("accept-encoding")) if variants else ()
+            for encoding, variant_path, variant_stat in variants:
+                if encoding in accepted:
+                    media_type = mimetypes.guess_type(relative)[0] or "application/octet-stream"
+                    response = FileResponse(variant_path, status_code=status_code, stat_result=variant_stat, media_type=media_type)
+                    response.headers["Content-Encoding"] = encoding
+                    break
+            if variants:
+                response = response or FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+                response.headers["Vary"] = "Accept-Encoding"
+        response = response or FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        if immutable:
+            response.headers["Cache-Control"] = IMMUTABLE
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
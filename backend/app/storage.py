@@ -0,0 +1,112 @@
+"""
+Content-addressed storage for uploaded moment audio.
+
+Uploads are streamed to a temporary file in fixed-size chunks while being
+hashed, then renamed to a path derived from their SHA-256 digest:
+
+    static/audio/moments/<aa>/<bb>/<sha256><ext>
+
+Identical uploads therefore share one file, concurrent uploads can never
+overwrite each other, and the two levels of sharding keep each directory small.
+
+Starlette parses (and spools) the whole multipart body before the route runs,
+so UploadSizeLimit caps the upload requests themselves: a body over the limit
+is refused from its Content-Length, or as soon as a streamed one passes it.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from .config import settings
+
+STATIC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "static"))
+MOMENT_AUDIO_DIR = os.path.join(STATIC_DIR, "audio", "moments")
+MOMENT_AUDIO_URL = "/static/audio/moments"
+CHUNK_SIZE = 64 * 1024
+# The audio file plus room for the multipart framing and the other form fields.
+MAX_UPLOAD_REQUEST_BYTES = settings.MAX_AUDIO_UPLOAD_BYTES + 1024 * 1024
+
+_EXTENSION = re.compile(r"\.[a-z0-9]{1,8}")
+
+def _extension(filename: str):
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _EXTENSION.fullmatch(ext) else ""
+
+def _too_large():
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Audio uploads are limited to {settings.MAX_AUDIO_UPLOAD_BYTES} bytes",
+    )
+
+def _store(source, ext: str):
+    os.makedirs(MOMENT_AUDIO_DIR, exist_ok=True)
+    # The temp file lives in the target tree so the final rename is atomic.
+    fd, tmp_path = tempfile.mkstemp(dir=MOMENT_AUDIO_DIR, prefix=".upload-")
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.MAX_AUDIO_UPLOAD_BYTES:
+                    raise _too_large()
+                digest.update(chunk)
+                out.write(chunk)
+
+        name = digest.hexdigest()
+        relative_path = f"{name[:2]}/{name[2:4]}/{name}{ext}"
+        final_path = os.path.join(MOMENT_AUDIO_DIR, *relative_path.split("/"))
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+        return relative_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class UploadSizeLimit:
+    """Pure ASGI middleware refusing bodies over `max_bytes` on `paths` with a 413."""
+
+    def __init__(self, app, paths, max_bytes: int):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > self.max_bytes:
+            error = _too_large()
+            return await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                # Raised inside the route's body parsing, so it becomes a 413 response.
+                if received > self.max_bytes:
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def save_moment_audio(upload: UploadFile):
+    """Stores an uploaded audio file and returns its public URL."""
+    if upload.size is not None and upload.size > settings.MAX_AUDIO_UPLOAD_BYTES:
+        raise _too_large()
+    relative_path = await run_in_threadpool(_store, upload.file, _extension(upload.filename))
+    return f"{MOMENT_AUDIO_URL}/{relative_path}"
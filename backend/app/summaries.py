@@ -0,0 +1,41 @@
+"""
+Weekly summary text. Depends only on app.terms, so the analysis worker
+processes (see background_tasks.ReflectionPipeline) start without a database
+client.
+"""
+from .terms import top_terms
+
+# Set once per worker process by set_document_frequency (pool initializer).
+_document_frequency = {}
+_total_documents = 0
+
+
+def set_document_frequency(document_frequency, total_documents):
+    global _document_frequency, _total_documents
+    _document_frequency = document_frequency
+    _total_documents = total_documents
+
+
+def summarize(moments_count, first_text, last_text, theme):
+    """Builds the spoken summary for a week with `moments_count` moments."""
+    if moments_count == 0:
+        return "No moments logged this week. Try to capture a few thoughts next week!"
+    if moments_count == 1:
+        return f"This week you captured one moment: '{first_text}'. What will you focus on next?"
+    return (
+        f"This week you logged {moments_count} moments. "
+        f"You started by reflecting on '{first_text}' and ended on '{last_text}'. "
+        f"A recurring theme in your moments was '{theme or 'reflection'}'. Keep reflecting!"
+    )
+
+
+def summarize_batch(weeks):
+    """
+    (moments_count, first_text, last_text, term_counts) per user ->
+    (summary, theme) per user, with themes TF-IDF-ranked across the batch.
+    """
+    themes = top_terms([week[3] for week in weeks], _document_frequency, _total_documents)
+    return [
+        (summarize(count, first_text, last_text, theme), theme)
+        for (count, first_text, last_text, _), theme in zip(weeks, themes)
+    ]
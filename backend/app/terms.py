@@ -0,0 +1,81 @@
+"""
+Term statistics for theme extraction.
+
+Moments are tokenized once, when they are written: their term counts are
+added to the user's daily rollup (`terms.<term>` in daily_rollups) and every
+distinct term bumps a global document frequency in `term_df`, where a
+document is one moment:
+
+    {"_id": "deadline", "df": 1234}
+    {"_id": "#documents", "df": 98765}    # total moments counted
+
+A user's weekly theme is the term with the highest TF-IDF over their week.
+top_terms() scores a whole batch of users at once with NumPy. Kept free of
+app imports so the reflection analysis workers can use it.
+"""
+import re
+from collections import Counter
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+TERM_DF_COLLECTION = "term_df"
+# Not a possible term: tokens are \w+ only.
+DOCUMENTS_KEY = "#documents"
+
+# A list of common English stopwords to exclude from theme analysis
+STOPWORDS = set([
+    "i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you", "your", "yours",
+    "yourself", "yourselves", "he", "him", "his", "himself", "she", "her", "hers",
+    "herself", "it", "its", "itself", "they", "them", "their", "theirs", "themselves",
+    "what", "which", "who", "whom", "this", "that", "these", "those", "am", "is", "are",
+    "was", "were", "be", "been", "being", "have", "has", "had", "having", "do", "does",
+    "did", "doing", "a", "an", "the", "and", "but", "if", "or", "because", "as", "until",
+    "while", "of", "at", "by", "for", "with", "about", "against", "between", "into",
+    "through", "during", "before", "after", "above", "below", "to", "from", "up", "down",
+    "in", "out", "on", "off", "over", "under", "again", "further", "then", "once", "here",
+    "there", "when", "where", "why", "how", "all", "any", "both", "each", "few", "more",
+    "most", "other", "some", "such", "no", "nor", "not", "only", "own", "same", "so",
+    "than", "too", "very", "s", "t", "can", "will", "just", "don", "should", "now"
+])
+
+_WORD = re.compile(r'\b\w+\b')
+
+
+def term_counts(text: str) -> Counter:
+    """Stopword-filtered, lowercased term counts of one text."""
+    return Counter(word for word in _WORD.findall((text or "").lower()) if word not in STOPWORDS)
+
+
+def top_terms(
+    term_counts_per_user: Sequence[Mapping[str, int]],
+    document_frequency: Mapping[str, int],
+    total_documents: int,
+) -> List[Optional[str]]:
+    """
+    The highest TF-IDF term for each user in the batch (None if they have no
+    terms). Builds one users x vocabulary matrix for the batch, so the scoring
+    is a handful of array operations rather than a Python loop per term.
+    """
+    vocabulary: Dict[str, int] = {}
+    rows, columns, counts = [], [], []
+    for row, user_terms in enumerate(term_counts_per_user):
+        for term, count in user_terms.items():
+            if count > 0:
+                rows.append(row)
+                columns.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+    if not vocabulary:
+        return [None] * len(term_counts_per_user)
+
+    terms = list(vocabulary)
+    # Smoothed IDF, so unseen terms and a zero total stay finite.
+    df = np.fromiter((document_frequency.get(term, 0) for term in terms), dtype=np.float64, count=len(terms))
+    idf_vector = np.log((1.0 + total_documents) / (1.0 + df)) + 1.0
+
+    tf = np.zeros((len(term_counts_per_user), len(terms)), dtype=np.float64)
+    tf[rows, columns] = counts
+    scores = np.log1p(tf) * idf_vector
+    best = scores.argmax(axis=1)
+    has_terms = scores.max(axis=1) > 0
+    return [terms[column] if present else None for column, present in zip(best.tolist(), has_terms.tolist())]
@@ -0,0 +1,212 @@
+"""
+Text-to-speech for reflection summaries.
+
+Backends turn text into audio bytes. `gtts` calls Google's service; `local`
+writes a silent WAV of a length that follows the text, for tests and offline
+development. TTS_BACKEND picks one.
+
+AudioCache stores the output content-addressed:
+
+    static/audio/tts/<aa>/<sha256(backend, voice, lang, text)>.<ext>
+
+Identical summaries (every inactive user gets the same one) share one file
+and one synthesis call. Files are touched on every hit, and evict() removes
+the least recently used unreferenced ones until the cache fits in
+TTS_CACHE_MAX_BYTES. Which files count as referenced is up to the caller: the
+reflection run protects those that a reflection from the last
+TTS_REFERENCE_DAYS points at. Uploaded moment audio under
+static/audio/moments is never touched.
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import wave
+from concurrent.futures import Future
+from typing import Callable, Iterable, List
+from .config import settings
+from .storage import STATIC_DIR
+
+logger = logging.getLogger(__name__)
+
+AUDIO_DIR = os.path.join(STATIC_DIR, "audio")
+AUDIO_URL = "/static/audio"
+TTS_DIR = os.path.join(AUDIO_DIR, "tts")
+TTS_URL = f"{AUDIO_URL}/tts"
+# Eviction candidates are checked for references this many at a time.
+EVICT_BATCH_SIZE = 500
+
+
+class GTTSBackend:
+    name = "gtts"
+    extension = ".mp3"
+
+    def synthesize(self, text: str, lang: str, voice: str) -> bytes:
+        # Imported lazily so the local backend works without gTTS's network deps.
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, tld=voice or "com").write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class LocalBackend:
+    """Offline stand-in: silent 8 kHz mono WAV, about a quarter second per word."""
+    name = "local"
+    extension = ".wav"
+    SAMPLE_RATE = 8000
+
+    def synthesize(self, text: str, lang: str, voice: str) -> bytes:
+        seconds = min(60.0, max(0.5, 0.25 * len(text.split())))
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(self.SAMPLE_RATE)
+            out.writeframes(b"\x00\x00" * int(seconds * self.SAMPLE_RATE))
+        return buffer.getvalue()
+
+
+BACKENDS = {backend.name: backend for backend in (GTTSBackend, LocalBackend)}
+
+
+def get_backend(name: str):
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend {name!r}; expected one of {sorted(BACKENDS)}")
+
+
+class AudioCache:
+    def __init__(self, backend, directory: str, url_prefix: str, max_bytes: int, lang: str = "en", voice: str = ""):
+        self.backend = backend
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.max_bytes = max_bytes
+        self.lang = lang
+        self.voice = voice
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def key(self, text: str) -> str:
+        material = "\0".join((self.backend.name, self.voice, self.lang, text))
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _location(self, key: str):
+        relative = f"{key[:2]}/{key}{self.backend.extension}"
+        return os.path.join(self.directory, relative), f"{self.url_prefix}/{relative}"
+
+    def audio_url(self, text: str) -> str:
+        """Returns the URL of `text` as audio, synthesizing it on a cache miss."""
+        key = self.key(text)
+        path, url = self._location(key)
+        if self._touch(path):
+            return url
+
+        # Threads asking for the same text while it is being synthesized wait
+        # for that one call instead of starting their own.
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            if not self._touch(path):
+                self._write(path, self.backend.synthesize(text, self.lang, self.voice))
+            future.set_result(url)
+            return url
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tts-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _candidates(self):
+        """(path, url) of every cached file, plus legacy per-reflection files in static/audio."""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.startswith("."):
+                    path = os.path.join(root, name)
+                    yield path, f"{self.url_prefix}/{os.path.relpath(path, self.directory).replace(os.sep, '/')}"
+        if os.path.isdir(AUDIO_DIR):
+            for entry in os.scandir(AUDIO_DIR):
+                if entry.is_file() and entry.name.endswith(".mp3"):
+                    yield entry.path, f"{AUDIO_URL}/{entry.name}"
+
+    def evict(self, referenced: Callable[[List[str]], Iterable[str]]) -> int:
+        """
+        Deletes least recently used, unreferenced files until the total size is
+        within max_bytes. `referenced` is given a batch of candidate URLs and
+        returns those still in use; it is only asked about as many files as
+        have to go. Returns the number of bytes freed.
+        """
+        files = []
+        total = 0
+        for path, url in self._candidates():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            files.append((stat.st_mtime, stat.st_size, path, url))
+        if total <= self.max_bytes:
+            return 0
+
+        files.sort()
+        freed = 0
+        for start in range(0, len(files), EVICT_BATCH_SIZE):
+            if total - freed <= self.max_bytes:
+                break
+            batch = files[start:start + EVICT_BATCH_SIZE]
+            in_use = set(referenced([url for _, _, _, url in batch]))
+            for _, size, path, url in batch:
+                if total - freed <= self.max_bytes:
+                    break
+                if url in in_use:
+                    continue
+                try:
+                    os.unlink(path)
+                    freed += size
+                except FileNotFoundError:
+                    pass
+        if freed:
+            logger.info("TTS cache evicted", extra={"freedBytes": freed, "remainingBytes": total - freed})
+        elif total > self.max_bytes:
+            logger.warning("TTS cache over budget but every file is referenced", extra={"bytes": total})
+        return freed
+
+
+tts_cache = AudioCache(
+    get_backend(settings.TTS_BACKEND),
+    TTS_DIR,
+    TTS_URL,
+    settings.TTS_CACHE_MAX_BYTES,
+    lang=settings.TTS_LANG,
+    voice=settings.TTS_VOICE,
+)
@@ -0,0 +1,13 @@
+"""
+Gunicorn worker class for the API; see gunicorn_config.py.
+
+WebSocket per-message deflate is turned off. It keeps a zlib compressor and
+decompressor for every socket, which made up about four fifths of an idle
+connection's memory (bench_ws_idle: ~225 KiB per socket with it, ~46 KiB
+without), and the messages we send are a few hundred bytes.
+"""
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    CONFIG_KWARGS = {**BaseUvicornWorker.CONFIG_KWARGS, "ws_per_message_deflate": False}
@@ -1,4 +1,292 @@
-from typing import Set
-from fastapi import WebSocket
+"""
+Per-user WebSocket channels with cross-worker delivery.
 
-connected_clients: Set[WebSocket] = set()
\ No newline at end of file
+Each API worker holds its own sockets, grouped by the authenticated user's
+id. Messages are never sent to sockets directly: any process (an API worker
+or worker.py) publishes them to the `ws_events` collection,
+
+    {"userId": "<user id>", "message": {...}, "createdAt": ...}
+
+and every API worker follows that collection with a change stream, handing
+each event to the sockets it holds for that user. A user connected to any
+worker therefore gets their own messages and nobody else's.
+
+Sends to a user's sockets run concurrently, each bounded by
+WS_SEND_TIMEOUT_SECONDS; a socket that errors or times out is closed and
+dropped, so one slow client cannot hold up the rest. ChannelHub also keeps
+the worker's sockets healthy and bounded; see its docstring. Events expire after
+WS_EVENT_TTL_SECONDS (TTL index, see app.indexes).
+
+Change streams need a replica set (Atlas always is). Against a standalone
+server, e.g. a local mongod, the hub falls back to polling the collection.
+createdAt is stamped by each publisher's clock and inserts can commit out of
+order, so every poll re-reads the last WS_POLL_OVERLAP_SECONDS of events and
+skips the ones it has already dispatched.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set, Tuple
+from fastapi import WebSocket, status
+from pymongo.errors import OperationFailure, PyMongoError
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+WS_EVENTS_COLLECTION = "ws_events"
+
+# "The $changeStream stage is only supported on replica sets"
+_CHANGE_STREAMS_UNSUPPORTED = 40573
+_RETRY_SECONDS = 1.0
+# Clients answer with {"type": "pong"}; any message they send counts as a sign of life.
+PING = json.dumps({"type": "ping"})
+
+
+def ws_event(user_id, message: dict) -> dict:
+    return {"userId": str(user_id), "message": message, "createdAt": datetime.utcnow()}
+
+
+def publish_many(db, messages: Iterable[Tuple[object, dict]]):
+    """
+    Queues each (user_id, message) pair for every socket that user has open,
+    on any worker, in one write; None if there are none. Works with both
+    pymongo and Motor databases (await the result for Motor).
+    """
+    events = [ws_event(user_id, message) for user_id, message in messages]
+    if events:
+        return db[WS_EVENTS_COLLECTION].insert_many(events, ordered=False)
+
+
+def _rss_bytes() -> int:
+    """Resident set size of this process, or 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class Connection:
+    """One open socket. Slotted, since a worker may hold tens of thousands."""
+    __slots__ = ("websocket", "user_id", "connected_at", "last_seen", "bytes_sent", "bytes_received")
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.connected_at = self.last_seen = time.monotonic()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def seen(self, size: int):
+        self.last_seen = time.monotonic()
+        self.bytes_received += size
+
+
+class ChannelHub:
+    """
+    The sockets held by this worker, by user. Besides delivery it:
+
+    * sends a ping every WS_HEARTBEAT_SECONDS and closes sockets that have
+      sent nothing (pongs included) for WS_IDLE_TIMEOUT_SECONDS, or whose
+      ping cannot be sent;
+    * sheds new connections with 1013 (try again later) once the worker holds
+      WS_MAX_CONNECTIONS sockets or its RSS reaches WS_MAX_RSS_BYTES;
+    * accounts for memory: stats() reports RSS growth per open connection.
+    """
+
+    def __init__(self, send_timeout: float, poll_interval: float, poll_overlap: float, heartbeat_interval: float,
+                 idle_timeout: float, max_connections: int, max_rss_bytes: int = 0):
+        self.send_timeout = send_timeout
+        self.poll_interval = poll_interval
+        self.poll_overlap = poll_overlap
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.max_rss_bytes = max_rss_bytes
+        self._channels: Dict[str, Set[Connection]] = {}
+        self._connection_count = 0
+        self._sends: Set[asyncio.Task] = set()
+        self._tasks = []
+        self._baseline_rss = 0
+        self.shed = 0
+        self.reaped = 0
+
+    @property
+    def connection_count(self) -> int:
+        return self._connection_count
+
+    def overloaded(self) -> Optional[str]:
+        """Why a new connection should be shed, or None to accept it."""
+        if self._connection_count >= self.max_connections:
+            return "connections"
+        if self.max_rss_bytes and _rss_bytes() >= self.max_rss_bytes:
+            return "memory"
+        return None
+
+    async def shed_connection(self, websocket: WebSocket, reason: str):
+        # Accepted first so the client sees the close code rather than a bare 403.
+        self.shed += 1
+        logger.warning("Shedding WebSocket connection", extra={"reason": reason, "connections": self._connection_count})
+        await websocket.accept()
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+    def connect(self, user_id: str, websocket: WebSocket) -> Connection:
+        connection = Connection(websocket, user_id)
+        self._channels.setdefault(user_id, set()).add(connection)
+        self._connection_count += 1
+        return connection
+
+    def disconnect(self, connection: Connection):
+        """Forgets `connection`; safe to call more than once."""
+        sockets = self._channels.get(connection.user_id)
+        if sockets is None or connection not in sockets:
+            return
+        sockets.discard(connection)
+        self._connection_count -= 1
+        if not sockets:
+            del self._channels[connection.user_id]
+
+    async def send_to_user(self, user_id: str, message: dict) -> int:
+        """Sends to every local socket of `user_id` at once; returns how many succeeded."""
+        sockets = list(self._channels.get(user_id, ()))
+        if not sockets:
+            return 0
+        text = json.dumps(message)
+        results = await asyncio.gather(*(self._send(connection, text) for connection in sockets))
+        return sum(results)
+
+    async def _send(self, connection: Connection, text: str) -> bool:
+        try:
+            await asyncio.wait_for(connection.websocket.send_text(text), self.send_timeout)
+            connection.bytes_sent += len(text)
+            return True
+        except Exception as e:
+            logger.info("Dropping WebSocket after failed send", extra={"userId": connection.user_id, "error": repr(e)})
+            await self._close(connection, status.WS_1011_INTERNAL_ERROR)
+            return False
+
+    async def _close(self, connection: Connection, code: int):
+        self.disconnect(connection)
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+    async def heartbeat(self):
+        """Closes sockets idle for longer than idle_timeout and pings the rest."""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle, live = [], []
+        for sockets in self._channels.values():
+            for connection in sockets:
+                (idle if connection.last_seen < cutoff else live).append(connection)
+        if idle:
+            self.reaped += len(idle)
+            logger.info("Reaping idle WebSockets", extra={"count": len(idle)})
+            await asyncio.gather(*(self._close(connection, status.WS_1001_GOING_AWAY) for connection in idle))
+        results = await asyncio.gather(*(self._send(connection, PING) for connection in live))
+        self.reaped += results.count(False)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.warning("WebSocket heartbeat failed", extra={"error": str(e)})
+
+    def stats(self) -> dict:
+        rss = _rss_bytes()
+        count = self._connection_count
+        return {
+            "connections": count,
+            "users": len(self._channels),
+            "maxConnections": self.max_connections,
+            "rssBytes": rss,
+            "rssBytesPerConnection": round(max(0, rss - self._baseline_rss) / count) if count and rss else None,
+            "shed": self.shed,
+            "reaped": self.reaped,
+        }
+
+    def dispatch(self, event: dict):
+        """Delivers one ws_events document in the background, if this worker holds the user."""
+        user_id = event.get("userId")
+        if user_id not in self._channels:
+            return
+        # Not awaited: a slow user must not hold up the events behind it.
+        task = asyncio.create_task(self.send_to_user(user_id, event.get("message")))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+
+    async def _follow(self, db):
+        resume_token = None
+        while True:
+            try:
+                async with db[WS_EVENTS_COLLECTION].watch(
+                    [{"$match": {"operationType": "insert"}}],
+                    resume_after=resume_token,
+                ) as stream:
+                    async for change in stream:
+                        resume_token = change["_id"]
+                        self.dispatch(change["fullDocument"])
+            except OperationFailure as e:
+                if e.code == _CHANGE_STREAMS_UNSUPPORTED:
+                    break
+                # Most likely the resume token fell out of the oplog; start afresh.
+                logger.warning("WebSocket event stream failed", extra={"error": str(e)})
+                resume_token = None
+            except PyMongoError as e:
+                logger.warning("WebSocket event stream interrupted", extra={"error": str(e)})
+            await asyncio.sleep(_RETRY_SECONDS)
+        logger.warning("Change streams unavailable; polling ws_events instead")
+        await self._poll(db)
+
+    async def _poll(self, db):
+        collection = db[WS_EVENTS_COLLECTION]
+        overlap = timedelta(seconds=self.poll_overlap)
+        # _id -> createdAt of the events in the window already dispatched (or
+        # already there at startup, which belong to no socket of ours).
+        seen = {}
+        async for event in collection.find({"createdAt": {"$gte": datetime.utcnow() - overlap}}, {"createdAt": 1}):
+            seen[event["_id"]] = event["createdAt"]
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                since = datetime.utcnow() - overlap
+                async for event in collection.find({"createdAt": {"$gte": since}}).sort("createdAt", 1):
+                    if event["_id"] not in seen:
+                        seen[event["_id"]] = event["createdAt"]
+                        self.dispatch(event)
+                seen = {event_id: created_at for event_id, created_at in seen.items() if created_at >= since}
+            except PyMongoError as e:
+                logger.warning("WebSocket event poll failed", extra={"error": str(e)})
+
+    def start(self, db):
+        if not self._tasks:
+            self._baseline_rss = _rss_bytes()
+            self._tasks = [asyncio.create_task(self._follow(db)), asyncio.create_task(self._heartbeat_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        for task in list(self._sends):
+            task.cancel()
+
+
+hub = ChannelHub(
+    send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+    poll_interval=settings.WS_POLL_SECONDS,
+    poll_overlap=settings.WS_POLL_OVERLAP_SECONDS,
+    heartbeat_interval=settings.WS_HEARTBEAT_SECONDS,
+    idle_timeout=settings.WS_IDLE_TIMEOUT_SECONDS,
+    max_connections=settings.WS_MAX_CONNECTIONS,
+    max_rss_bytes=settings.WS_MAX_RSS_BYTES,
+)
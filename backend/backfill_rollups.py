@@ -0,0 +1,88 @@
+import sys
+from collections import Counter, defaultdict
+from pymongo import MongoClient, UpdateOne
+from app.config import settings
+from app.indexes import ensure_indexes_sync
+from app.rollups import (
+    ROLLUP_COLLECTION, document_frequencies, document_frequency_updates, increment_updates, rollup_increments,
+    tag_virtues,
+)
+from app.terms import TERM_DF_COLLECTION
+
+BATCH_SIZE = 1000
+
+def backfill_user(db, user, frequencies=None):
+    """
+    Re-tags every moment of `user` and rebuilds their daily rollups from
+    scratch. Their term document frequencies are added to `frequencies`, if given.
+    """
+    custom_virtues = (user.get("settings") or {}).get("customVirtues", [])
+    moments = db.moments.find(
+        {"userId": user["_id"]},
+        {"userId": 1, "text": 1, "type": 1, "createdAt": 1},
+        batch_size=BATCH_SIZE,
+    )
+
+    increments = defaultdict(Counter)
+    count = 0
+    batch = []
+    for moment in moments:
+        batch.append(moment)
+        if len(batch) == BATCH_SIZE:
+            count += _tag_batch(db, batch, custom_virtues, increments, frequencies)
+            batch = []
+    if batch:
+        count += _tag_batch(db, batch, custom_virtues, increments, frequencies)
+
+    db[ROLLUP_COLLECTION].delete_many({"userId": user["_id"]})
+    updates = increment_updates(increments)
+    if updates:
+        db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+    return count, len(updates)
+
+def _tag_batch(db, batch, custom_virtues, increments, frequencies):
+    tag_virtues(batch, custom_virtues)
+    db.moments.bulk_write(
+        [UpdateOne({"_id": m["_id"]}, {"$set": {"virtues": m["virtues"]}}) for m in batch],
+        ordered=False,
+    )
+    for key, counter in rollup_increments(batch).items():
+        increments[key].update(counter)
+    if frequencies is not None:
+        frequencies.update(document_frequencies(batch))
+    return len(batch)
+
+def backfill_rollups(email=None):
+    """
+    Tags existing moments with their virtues and rebuilds daily_rollups and,
+    when run for every user, the term_df table. Safe to re-run; each user's
+    rollups are replaced, not added to. A single-user run leaves term_df
+    alone, since that user's share of it cannot be told apart. Moments
+    written for a user while their rollups are being rebuilt can be counted
+    twice or missed, so run it when traffic is quiet (or re-run it after).
+    """
+    client = MongoClient(settings.MONGODB_URI, serverSelectionTimeoutMS=5000)
+    db = client.get_database(settings.MONGODB_DB_NAME)
+    ensure_indexes_sync(db)
+
+    query = {"email": email} if email else {}
+    frequencies = None if email else Counter()
+    users = moments_total = 0
+    for user in db.users.find(query, {"settings": 1}):
+        moments, days = backfill_user(db, user, frequencies)
+        users += 1
+        moments_total += moments
+        print(f"{user['_id']}: {moments} moments -> {days} daily rollups")
+
+    if frequencies is not None:
+        db[TERM_DF_COLLECTION].drop()
+        updates = document_frequency_updates(frequencies)
+        for i in range(0, len(updates), BATCH_SIZE):
+            db[TERM_DF_COLLECTION].bulk_write(updates[i:i + BATCH_SIZE], ordered=False)
+        print(f"Rebuilt {TERM_DF_COLLECTION}: {len(frequencies) - 1 if frequencies else 0} terms")
+
+    client.close()
+    print(f"\nBackfilled {moments_total} moments for {users} user(s).")
+
+if __name__ == "__main__":
+    backfill_rollups(email=sys.argv[1] if len(sys.argv) > 1 else None)
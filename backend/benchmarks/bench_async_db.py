@@ -0,0 +1,86 @@
+"""
+Throughput of the old sync handler path versus the Motor-based async path.
+
+The sync path mirrors what FastAPI did for a `def` handler: each request is
+pushed onto the anyio worker threadpool (40 threads by default) and runs a
+blocking pymongo query there. The async path runs the same query through the
+pooled AsyncIOMotorClient directly on the event loop.
+
+    python -m benchmarks.bench_async_db [requests] [concurrency]
+"""
+import asyncio
+import sys
+import time
+
+import anyio.to_thread
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from .common import BENCH_DB_NAME, MONGODB_URI, report, synthetic_moments, new_user_id
+
+USERS = 50
+MOMENTS_PER_USER = 200
+
+
+def seed(db):
+    db.moments.drop()
+    user_ids = []
+    for i in range(USERS):
+        user_id = new_user_id()
+        user_ids.append(user_id)
+        db.moments.insert_many(synthetic_moments(user_id, MOMENTS_PER_USER, days=365, seed=i))
+    db.moments.create_index([("userId", 1), ("type", 1), ("createdAt", -1)])
+    return user_ids
+
+
+def sync_get_moments(db, user_id):
+    return list(db.moments.find({"userId": user_id, "type": "moment"}).sort("createdAt", -1))
+
+
+async def async_get_moments(db, user_id):
+    return await db.moments.find({"userId": user_id, "type": "moment"}).sort("createdAt", -1).to_list(length=None)
+
+
+async def drive(name, handler, user_ids, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(user_ids[i % len(user_ids)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    report(name, latencies, time.perf_counter() - start)
+
+
+async def main(requests, concurrency):
+    sync_client = MongoClient(MONGODB_URI)
+    sync_db = sync_client.get_database(BENCH_DB_NAME)
+    user_ids = seed(sync_db)
+
+    async def sync_handler(user_id):
+        # Same dispatch FastAPI uses for plain `def` endpoints.
+        await anyio.to_thread.run_sync(sync_get_moments, sync_db, user_id)
+
+    async_client = AsyncIOMotorClient(MONGODB_URI, maxPoolSize=100)
+    async_db = async_client.get_database(BENCH_DB_NAME)
+
+    async def async_handler(user_id):
+        await async_get_moments(async_db, user_id)
+
+    print(f"{requests} requests, concurrency {concurrency}, {USERS} users x {MOMENTS_PER_USER} moments")
+    await drive("sync pymongo (threadpool)", sync_handler, user_ids, requests, concurrency)
+    await drive("async motor (event loop)", async_handler, user_ids, requests, concurrency)
+
+    sync_db.moments.drop()
+    sync_client.close()
+    async_client.close()
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(main(requests, concurrency))
@@ -0,0 +1,130 @@
+"""
+Dashboard data path: four database round trips versus one.
+
+The old handler ran two count_documents calls for the weekly growth trend and
+two $sample aggregations for the quote and articles. The new handler folds the
+counts into one $group and picks the day's quote/articles from the in-memory
+catalog.
+Round trips are counted with a pymongo CommandListener.
+
+    python -m benchmarks.bench_dashboard [requests] [concurrency]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, monitoring
+
+from app.catalog import ContentCatalog
+from .common import BENCH_DB_NAME, MONGODB_URI, report, synthetic_moments, new_user_id
+
+USERS = 50
+MOMENTS_PER_USER = 200
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def seed(db):
+    for name in ("moments", "quotes", "articles"):
+        db[name].drop()
+    user_ids = []
+    for i in range(USERS):
+        user_id = new_user_id()
+        user_ids.append(user_id)
+        db.moments.insert_many(synthetic_moments(user_id, MOMENTS_PER_USER, days=14, seed=i))
+    db.moments.create_index([("userId", 1), ("createdAt", -1)])
+    db.quotes.insert_many([{"quote": f"Quote {i}", "author": "Bench"} for i in range(20)])
+    db.articles.insert_many([{"title": f"Article {i}", "summary": "", "link": "#"} for i in range(20)])
+    return user_ids
+
+
+def week_bounds():
+    now = datetime.utcnow()
+    start_of_this_week = now - timedelta(days=now.weekday())
+    return start_of_this_week, start_of_this_week - timedelta(days=7)
+
+
+async def old_dashboard(db, user_id):
+    start_of_this_week, start_of_last_week = week_bounds()
+    await db.moments.count_documents({"userId": user_id, "createdAt": {"$gte": start_of_this_week}})
+    await db.moments.count_documents(
+        {"userId": user_id, "createdAt": {"$gte": start_of_last_week, "$lt": start_of_this_week}}
+    )
+    await db.quotes.aggregate([{"$sample": {"size": 1}}]).to_list(length=1)
+    await db.articles.aggregate([{"$sample": {"size": 2}}]).to_list(length=None)
+
+
+async def new_dashboard(db, catalog, user_id):
+    start_of_this_week, start_of_last_week = week_bounds()
+    await db.moments.aggregate([
+        {"$match": {"userId": user_id, "createdAt": {"$gte": start_of_last_week}}},
+        {"$group": {
+            "_id": None,
+            "thisWeek": {"$sum": {"$cond": [{"$gte": ["$createdAt", start_of_this_week]}, 1, 0]}},
+            "lastWeek": {"$sum": {"$cond": [{"$lt": ["$createdAt", start_of_this_week]}, 1, 0]}},
+        }},
+    ]).to_list(length=1)
+    daily_seed = f"{user_id}:{datetime.utcnow().date().isoformat()}"
+    catalog.daily_quote(daily_seed)
+    catalog.daily_articles(daily_seed, 2)
+
+
+async def drive(name, handler, user_ids, requests, concurrency, counter):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(user_ids[i % len(user_ids)])
+            latencies.append(time.perf_counter() - start)
+
+    counter.count = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    report(name, latencies, time.perf_counter() - start)
+    print(f"{'':<32} round trips/request={counter.count / requests:.2f}")
+
+
+async def main(requests, concurrency):
+    sync_client = MongoClient(MONGODB_URI)
+    sync_db = sync_client.get_database(BENCH_DB_NAME)
+    user_ids = seed(sync_db)
+
+    counter = CommandCounter()
+    async_client = AsyncIOMotorClient(MONGODB_URI, maxPoolSize=100, event_listeners=[counter])
+    async_db = async_client.get_database(BENCH_DB_NAME)
+
+    catalog = ContentCatalog(ttl=300, poll_interval=15)
+    await catalog.load(async_db)
+
+    print(f"{requests} requests, concurrency {concurrency}, {USERS} users x {MOMENTS_PER_USER} moments")
+    await drive("4 queries (count x2, $sample x2)", lambda u: old_dashboard(async_db, u),
+                user_ids, requests, concurrency, counter)
+    await drive("1 $group + in-memory catalog", lambda u: new_dashboard(async_db, catalog, u),
+                user_ids, requests, concurrency, counter)
+
+    for name in ("moments", "quotes", "articles"):
+        sync_db[name].drop()
+    sync_client.close()
+    async_client.close()
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(main(requests, concurrency))
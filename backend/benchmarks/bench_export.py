@@ -0,0 +1,78 @@
+"""
+Memory of a full-history export: loading a user's moments with to_list() and
+serializing the lot (what the unpaginated list endpoints used to do) versus
+the streaming export in app.export, for growing history lengths.
+
+Peak Python allocations are measured with tracemalloc while each path runs to
+completion. The streaming path's peak should stay flat as the history grows,
+since it holds one cursor batch at a time; the bytes are discarded as they are
+produced, as a client socket would take them.
+
+    python -m benchmarks.bench_export [sizes, e.g. 10000,100000]
+"""
+import asyncio
+import json
+import sys
+import tracemalloc
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from app.export import export_rows, ndjson_chunks
+from .common import BENCH_DB_NAME, MONGODB_URI, Timer, new_user_id, synthetic_moments
+
+SEED_BATCH = 10000
+
+
+def seed(db, size):
+    db.moments.drop()
+    db.moments.create_index([("userId", 1), ("type", 1), ("createdAt", -1), ("_id", -1)])
+    user_id = new_user_id()
+    for start in range(0, size, SEED_BATCH):
+        db.moments.insert_many(synthetic_moments(user_id, min(SEED_BATCH, size - start), days=3650, seed=start))
+    return user_id
+
+
+async def load_all(db, user_id):
+    docs = await db.moments.find({"userId": user_id}).to_list(length=None)
+    body = json.dumps([{**doc, "_id": str(doc["_id"]), "userId": str(doc["userId"]),
+                        "createdAt": doc["createdAt"].isoformat()} for doc in docs])
+    return len(body)
+
+
+async def stream(db, user_id):
+    total = 0
+    async for chunk in ndjson_chunks(export_rows(db, user_id)):
+        total += len(chunk)
+    return total
+
+
+async def measure(name, fn, db, user_id):
+    tracemalloc.start()
+    with Timer() as timer:
+        size = await fn(db, user_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<10} {timer.elapsed:7.2f}s  peak={peak / 2**20:8.1f}MiB  body={size / 2**20:8.1f}MiB")
+
+
+async def run(sizes):
+    sync_client = MongoClient(MONGODB_URI)
+    sync_db = sync_client.get_database(BENCH_DB_NAME)
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client.get_database(BENCH_DB_NAME)
+    try:
+        for size in sizes:
+            user_id = seed(sync_db, size)
+            print(f"{size} moments")
+            await measure("to_list", load_all, db, user_id)
+            await measure("streaming", stream, db, user_id)
+    finally:
+        sync_db.moments.drop()
+        client.close()
+        sync_client.close()
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000, 500000]
+    asyncio.run(run(sizes))
@@ -0,0 +1,111 @@
+"""
+Cost per item of a moments list response: the old path, a models.Moment built
+for every document and then validated and serialized again through the
+response_model, versus plain dicts rendered by BSONJSONResponse (orjson).
+
+Both run as real routes of an in-process FastAPI app driven over ASGI, so the
+framework's own response handling is included. The fixed cost of a request is
+measured with an empty page and taken off before dividing by the page size.
+The page is also gzipped as GZipMiddleware would (same level), to show the
+wire size and what compression costs per item. No database or server needed.
+
+    python -m benchmarks.bench_json [items] [rounds]
+"""
+import asyncio
+import gzip
+import sys
+from typing import List
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+from app import models
+from app.config import settings
+from app.responses import BSONJSONResponse
+from .common import Timer, new_user_id, synthetic_moments
+
+REQUESTS_PER_ROUND = 20
+
+
+# app.main.moment_item; not imported, as that module needs a database.
+def moment_item(doc, moment_type):
+    return {
+        "text": doc["text"],
+        "type": moment_type,
+        "id": doc["_id"],
+        "userId": doc["userId"],
+        "createdAt": doc["createdAt"],
+        "audioUrl": doc.get("audioUrl"),
+    }
+
+
+def build_app(page):
+    bench = FastAPI()
+
+    @bench.get("/models", response_model=List[models.Moment])
+    async def as_models():
+        return [
+            models.Moment(
+                id=str(doc["_id"]),
+                userId=str(doc["userId"]),
+                text=doc["text"],
+                createdAt=doc["createdAt"],
+                type=doc["type"],
+                audioUrl=doc.get("audioUrl"),
+            )
+            for doc in page["docs"]
+        ]
+
+    @bench.get("/dicts", response_model=List[models.Moment])
+    async def as_dicts():
+        return BSONJSONResponse([moment_item(doc, doc["type"]) for doc in page["docs"]])
+
+    return bench
+
+
+async def best_request(client, path, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        with Timer() as timer:
+            for _ in range(REQUESTS_PER_ROUND):
+                response = await client.get(path)
+        best = min(best, timer.elapsed / REQUESTS_PER_ROUND)
+    return best, response.content
+
+
+async def run(items, rounds):
+    docs = synthetic_moments(new_user_id(), items)
+    for doc in docs:
+        doc["_id"] = ObjectId()
+    page = {"docs": []}
+    transport = httpx.ASGITransport(app=build_app(page))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {}
+        for path in ("/models", "/dicts"):
+            page["docs"] = []
+            empty, _ = await best_request(client, path, rounds)
+            page["docs"] = docs
+            full, body = await best_request(client, path, rounds)
+            per_item = (full - empty) / items
+            results[path] = (per_item, body)
+            print(f"{path:<8} {full * 1000:7.2f}ms per {items}-item page, "
+                  f"{empty * 1000:5.2f}ms fixed, {per_item * 1e6:6.2f}us per item")
+
+    old_body, new_body = results["/models"][1], results["/dicts"][1]
+    same = httpx.Response(200, content=old_body).json() == httpx.Response(200, content=new_body).json()
+    print(f"speedup per item: {results['/models'][0] / results['/dicts'][0]:.1f}x, same JSON: {same}")
+
+    best = float("inf")
+    for _ in range(rounds):
+        with Timer() as timer:
+            compressed = gzip.compress(new_body, compresslevel=settings.GZIP_LEVEL)
+        best = min(best, timer.elapsed)
+    print(f"gzip level {settings.GZIP_LEVEL}: {len(new_body)} -> {len(compressed)} bytes "
+          f"({len(compressed) / len(new_body):.0%}), {best / items * 1e6:.2f}us per item")
+
+
+if __name__ == "__main__":
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    asyncio.run(run(items, rounds))
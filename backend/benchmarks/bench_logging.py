@@ -0,0 +1,91 @@
+"""
+GET /moments handler latency with the old print tracing versus the logging pipeline.
+
+Replays the body of get_moments over an in-memory page of moments (no
+database) so only the tracing cost differs between runs. stdout is pointed at
+a line-buffered file, which is what gunicorn's capture_output gives the
+workers, so every old-style print is a write syscall on the request path.
+
+    python -m benchmarks.bench_logging [requests] [page_size]
+
+Set LOG_ROUTE_LEVELS=/api/v1/moments=DEBUG to include the handler's debug
+record in the logging run.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from bson import ObjectId
+
+from app import models
+from app.logging_config import current_route, setup_logging
+from .common import report, synthetic_moments
+
+logger = logging.getLogger("app.main")
+
+
+def build_page(page, trace):
+    moments = []
+    if trace == "print":
+        print("--- GET_MOMENTS: Fetching moments for user 'bench@example.com' ---")
+    for moment in page:
+        if trace == "print":
+            print(f"--- GET_MOMENTS: Processing moment from DB: {moment} ---")
+        moments.append(models.Moment(
+            id=str(moment["_id"]),
+            userId=str(moment["userId"]),
+            text=moment["text"],
+            createdAt=moment["createdAt"],
+            type="moment",
+            audioUrl=moment.get("audioUrl")
+        ))
+    if trace == "print":
+        print(f"--- GET_MOMENTS: Found {len(moments)} moments. Returning response. ---")
+    elif trace == "logging":
+        logger.debug("Moments page served", extra={"count": len(moments)})
+    return moments
+
+
+def run(page, trace, requests):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        build_page(page, trace)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+
+def main(requests, page_size):
+    page = synthetic_moments(ObjectId(), page_size)
+    for moment in page:
+        moment["_id"] = ObjectId()
+
+    real_stdout = sys.stdout
+    sink = tempfile.NamedTemporaryFile("w", buffering=1, delete=False)
+    sys.stdout = sink
+    try:
+        # The pipeline's listener writes to whatever stdout is at setup time.
+        setup_logging()
+    finally:
+        sys.stdout = real_stdout
+
+    token = current_route.set("/api/v1/moments")
+    print(f"{requests} requests x {page_size} moments per page")
+    for name, trace in (("no tracing", None), ("old print tracing", "print"), ("logging pipeline", "logging")):
+        sys.stdout = sink
+        try:
+            latencies, elapsed = run(page, trace, requests)
+        finally:
+            sys.stdout = real_stdout
+        report(name, latencies, elapsed)
+    current_route.reset(token)
+
+    sink.close()
+    os.unlink(sink.name)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500, int(sys.argv[2]) if len(sys.argv) > 2 else 200)
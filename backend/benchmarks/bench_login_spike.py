@@ -0,0 +1,74 @@
+"""
+Dashboard latency during a login storm.
+
+Runs against a live server (BASE_URL). It first measures GET /dashboard on its
+own, then measures it again while a burst of concurrent logins hammers
+/auth/login. With bcrypt on the dedicated password pool the dashboard p99
+should stay roughly flat, and logins beyond PASSWORD_HASH_MAX_PENDING are shed
+with 429 instead of queueing.
+
+    python -m benchmarks.bench_login_spike [seconds] [login_concurrency]
+
+Requires httpx (see benchmarks/requirements.txt).
+"""
+import asyncio
+import sys
+import time
+
+import httpx
+
+from .common import report
+
+BASE_URL = "http://127.0.0.1:8001/api/v1"
+USER = {"email": "bench-login@example.com", "password": "password123"}
+DASHBOARD_CONCURRENCY = 10
+
+
+async def get_token(client):
+    await client.post(f"{BASE_URL}/auth/signup", json=USER)
+    response = await client.post(f"{BASE_URL}/auth/login", data={"username": USER["email"], "password": USER["password"]})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def dashboard_load(client, headers, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(f"{BASE_URL}/dashboard", headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def login_storm(client, deadline, statuses):
+    form = {"username": USER["email"], "password": USER["password"]}
+    while time.perf_counter() < deadline:
+        response = await client.post(f"{BASE_URL}/auth/login", data=form)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 429:
+            await asyncio.sleep(0.05)
+
+
+async def phase(name, client, headers, seconds, login_concurrency):
+    deadline = time.perf_counter() + seconds
+    latencies, statuses = [], {}
+    tasks = [dashboard_load(client, headers, deadline, latencies) for _ in range(DASHBOARD_CONCURRENCY)]
+    tasks += [login_storm(client, deadline, statuses) for _ in range(login_concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    report(name, latencies, time.perf_counter() - start)
+    if statuses:
+        print(f"{'':<32} login responses: {dict(sorted(statuses.items()))}")
+
+
+async def main(seconds, login_concurrency):
+    limits = httpx.Limits(max_connections=DASHBOARD_CONCURRENCY + login_concurrency)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        headers = {"Authorization": f"Bearer {await get_token(client)}"}
+        await phase("dashboard (idle)", client, headers, seconds, 0)
+        await phase(f"dashboard ({login_concurrency} logins)", client, headers, seconds, login_concurrency)
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    login_concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(main(seconds, login_concurrency))
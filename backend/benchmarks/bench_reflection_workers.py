@@ -0,0 +1,80 @@
+"""
+Users/sec of the weekly reflection pipeline as analysis workers are added.
+
+The first table is analysis only (summarize_batch on the spawn process pool,
+no database), which is the stage that should scale with cores. The second
+runs the whole engine against BENCH_DB_NAME with audio off, so it also
+includes the aggregation and bulk writes.
+
+    python -m benchmarks.bench_reflection_workers [users] [moments_per_user]
+"""
+import multiprocessing
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from pymongo import MongoClient
+
+from app.background_tasks import ANALYSIS_BATCH_SIZE, run_weekly_reflections
+from app.rollups import ROLLUP_COLLECTION, document_frequencies
+from app.summaries import set_document_frequency, summarize_batch
+from app.terms import DOCUMENTS_KEY, TERM_DF_COLLECTION, term_counts
+from .bench_reflections import seed
+from .common import BENCH_DB_NAME, MONGODB_URI, Timer, random_text
+
+
+def worker_counts():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def analysis_only(users, moments_per_user):
+    rng = random.Random(0)
+    texts = [[random_text(rng, words=30) for _ in range(moments_per_user)] for _ in range(users)]
+    weeks = [(len(t), t[0], t[-1], term_counts(" ".join(t))) for t in texts]
+    document_frequency = document_frequencies({"text": text} for user_texts in texts for text in user_texts)
+    total_documents = document_frequency.pop(DOCUMENTS_KEY)
+    batches = [weeks[i:i + ANALYSIS_BATCH_SIZE] for i in range(0, users, ANALYSIS_BATCH_SIZE)]
+    print(f"analysis only: {users} users x {moments_per_user} moments")
+    baseline = None
+    for workers in worker_counts():
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=set_document_frequency,
+            initargs=(dict(document_frequency), total_documents),
+        ) as pool:
+            list(pool.map(summarize_batch, batches[:workers]))  # warm the workers up
+            with Timer() as timer:
+                list(pool.map(summarize_batch, batches))
+        rate = users / timer.elapsed
+        baseline = baseline or rate
+        print(f"  {workers:>3} workers {rate:>12,.0f} users/s  x{rate / baseline:.2f}")
+
+
+def end_to_end(users):
+    client = MongoClient(MONGODB_URI)
+    db = client.get_database(BENCH_DB_NAME)
+    seed(db, users)
+    print(f"end to end: {users} users")
+    for workers in worker_counts():
+        db.weekly_reflections.delete_many({})
+        db.reflection_runs.delete_many({})
+        result = run_weekly_reflections(db, synthesize_audio=False, analysis_workers=workers)
+        print(f"  {workers:>3} workers {result['usersPerSecond']:>12,.0f} users/s")
+    for name in ("users", "moments", "weekly_reflections", "reflection_runs", ROLLUP_COLLECTION, TERM_DF_COLLECTION):
+        db[name].drop()
+    client.close()
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    moments_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    analysis_only(users, moments_per_user)
+    end_to_end(users)
@@ -0,0 +1,113 @@
+"""
+Weekly reflection generation: the old per-user loop versus the set-based,
+chunked engine in app.background_tasks.
+
+Seeds `users` synthetic users (100k by default) with a few moments each in
+the last week. The old loop costs three round trips per user, so it only runs
+over a sample of users and its runtime is extrapolated to the full set. Audio
+synthesis is off for both, so only the database work is measured.
+
+    python -m benchmarks.bench_reflections [users] [old_sample]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+from app.background_tasks import run_weekly_reflections
+from app.summaries import summarize
+from app.indexes import ensure_indexes_sync
+from app.rollups import ROLLUP_COLLECTION, document_frequencies, document_frequency_updates, rollup_updates
+from app.terms import TERM_DF_COLLECTION, term_counts
+from .common import BENCH_DB_NAME, MONGODB_URI, Timer, new_user_id, random_text
+
+MAX_MOMENTS_PER_USER = 6
+SEED_BATCH = 10000
+
+
+def seed(db, users):
+    for name in ("users", "moments", "weekly_reflections", "reflection_runs", ROLLUP_COLLECTION, TERM_DF_COLLECTION):
+        db[name].drop()
+    ensure_indexes_sync(db)
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    user_docs, moment_docs = [], []
+    for i in range(users):
+        user_id = new_user_id()
+        user_docs.append({"_id": user_id, "email": f"bench{i}@example.com"})
+        for _ in range(rng.randint(0, MAX_MOMENTS_PER_USER)):
+            moment_docs.append({
+                "userId": user_id,
+                "text": random_text(rng),
+                "type": "moment",
+                "createdAt": now - timedelta(seconds=rng.randint(60, 6 * 86400)),
+            })
+        if len(moment_docs) >= SEED_BATCH:
+            _insert_moments(db, moment_docs)
+            moment_docs = []
+        if len(user_docs) >= SEED_BATCH:
+            db.users.insert_many(user_docs, ordered=False)
+            user_docs = []
+    if user_docs:
+        db.users.insert_many(user_docs, ordered=False)
+    if moment_docs:
+        _insert_moments(db, moment_docs)
+    return db.moments.count_documents({})
+
+
+def _insert_moments(db, moment_docs):
+    # As the API does: the moments, then their rollups and term frequencies.
+    db.moments.insert_many(moment_docs, ordered=False)
+    db[ROLLUP_COLLECTION].bulk_write(rollup_updates(moment_docs), ordered=False)
+    db[TERM_DF_COLLECTION].bulk_write(document_frequency_updates(document_frequencies(moment_docs)), ordered=False)
+
+
+def summarize_week(texts):
+    """The previous summary, straight from moment texts (oldest first), themed by the most frequent term."""
+    if not texts:
+        return summarize(0, None, None, None)
+    most_common = term_counts(" ".join(texts)).most_common(1)
+    return summarize(len(texts), texts[0], texts[-1], most_common[0][0] if most_common else None)
+
+
+def old_loop(db, sample):
+    """The previous implementation: find, insert_one and update_one per user."""
+    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    for user in db.users.find().limit(sample):
+        moments = list(db.moments.find({"userId": user["_id"], "createdAt": {"$gte": seven_days_ago}}).sort("createdAt", 1))
+        summary_text = summarize_week([m.get("text", "") for m in moments])
+        result = db.weekly_reflections.insert_one({
+            "userId": user["_id"], "summaryText": summary_text, "generatedAt": datetime.utcnow(), "audioUrl": None
+        })
+        db.weekly_reflections.update_one({"_id": result.inserted_id}, {"$set": {"audioUrl": f"/static/audio/{result.inserted_id}.mp3"}})
+
+
+def main(users, old_sample):
+    client = MongoClient(MONGODB_URI)
+    db = client.get_database(BENCH_DB_NAME)
+    with Timer() as timer:
+        moments = seed(db, users)
+    print(f"seeded {users} users, {moments} moments in {timer.elapsed:.1f}s")
+
+    with Timer() as timer:
+        old_loop(db, old_sample)
+    per_user = timer.elapsed / old_sample
+    print(f"{'per-user loop':<24} {old_sample} users in {timer.elapsed:.2f}s "
+          f"({old_sample / timer.elapsed:,.0f} users/s, ~{per_user * users:.0f}s extrapolated to {users})")
+    db.weekly_reflections.delete_many({})
+
+    with Timer() as timer:
+        result = run_weekly_reflections(db, synthesize_audio=False)
+    print(f"{'set-based engine':<24} {result['processed']} users in {timer.elapsed:.2f}s "
+          f"({result['processed'] / timer.elapsed:,.0f} users/s)")
+
+    for name in ("users", "moments", "weekly_reflections", "reflection_runs", ROLLUP_COLLECTION, TERM_DF_COLLECTION):
+        db[name].drop()
+    client.close()
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    old_sample = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    main(users, old_sample)
@@ -0,0 +1,94 @@
+"""
+Moment search over 1M moments: the client workaround (download the user's
+whole moment list, then filter it locally) versus one page of
+/api/v1/moments/search, served by the userId_text index.
+
+Seeds `users` x `moments_per_user` moments (1M by default) into the benchmark
+database with the application's moment indexes. The seed is kept and reused
+while the counts match, since building it takes a while. Each request picks
+a random user and a random one- or two-word query.
+
+    python -m benchmarks.bench_search [users] [moments_per_user] [requests] [concurrency]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from app.indexes import INDEXES
+from app.search import highlights, search_page, search_terms
+from .common import BENCH_DB_NAME, MONGODB_URI, WORDS, new_user_id, report, synthetic_moments
+
+PAGE_SIZE = 50
+SEED_USERS_PER_BATCH = 20
+
+
+def seed(db, users, moments_per_user):
+    if db.moments.estimated_document_count() == users * moments_per_user:
+        return db.moments.distinct("userId")
+    db.moments.drop()
+    user_ids = [new_user_id() for _ in range(users)]
+    for start in range(0, users, SEED_USERS_PER_BATCH):
+        docs = []
+        for i, user_id in enumerate(user_ids[start:start + SEED_USERS_PER_BATCH], start):
+            docs.extend(synthetic_moments(user_id, moments_per_user, days=365, seed=i))
+        db.moments.insert_many(docs, ordered=False)
+    db.moments.create_indexes(INDEXES["moments"])
+    return user_ids
+
+
+def random_query(rng):
+    return " ".join(rng.sample(WORDS, rng.choice((1, 2))))
+
+
+async def download_and_filter(db, user_id, q):
+    words = q.split()
+    docs = await db.moments.find({"userId": user_id, "type": "moment"}).sort("createdAt", -1).to_list(length=None)
+    return [doc for doc in docs if any(word in doc["text"].lower() for word in words)][:PAGE_SIZE]
+
+
+async def text_search(db, user_id, q):
+    page, _ = await search_page(db.moments, user_id, q, PAGE_SIZE, moment_type="moment")
+    terms = search_terms(q)
+    return [highlights(doc["text"], terms) for doc in page]
+
+
+async def run(name, fn, db, user_ids, requests, concurrency):
+    rng = random.Random(0)
+    work = [(rng.choice(user_ids), random_query(rng)) for _ in range(requests)]
+    limiter = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(user_id, q):
+        async with limiter:
+            start = time.perf_counter()
+            await fn(db, user_id, q)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(user_id, q) for user_id, q in work))
+    report(name, latencies, time.perf_counter() - start)
+
+
+async def main(users, moments_per_user, requests, concurrency):
+    sync_client = MongoClient(MONGODB_URI)
+    user_ids = seed(sync_client.get_database(BENCH_DB_NAME), users, moments_per_user)
+    sync_client.close()
+    print(f"{len(user_ids)} users x {moments_per_user} moments")
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client.get_database(BENCH_DB_NAME)
+    await run("download + filter", download_and_filter, db, user_ids, requests, concurrency)
+    await run("$text search page", text_search, db, user_ids, requests, concurrency)
+    client.close()
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    moments_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    requests = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+    asyncio.run(main(users, moments_per_user, requests, concurrency))
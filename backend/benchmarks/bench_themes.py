@@ -0,0 +1,72 @@
+"""
+Weekly theme extraction: re-tokenizing each user's week of moment text into a
+fresh Counter (the old approach) versus TF-IDF ranking of the term counts kept
+in the daily rollups, scored a batch of users at a time by
+app.terms.top_terms.
+
+Pure CPU; no database needed. The rollup side starts from already-summed term
+counts, as the reflection engine does.
+
+    python -m benchmarks.bench_themes [users] [moments_per_user] [rounds]
+"""
+import random
+import string
+import sys
+
+from app.rollups import document_frequencies
+from app.terms import DOCUMENTS_KEY, term_counts, top_terms
+from .common import Timer, random_text
+
+# app.background_tasks.ANALYSIS_BATCH_SIZE; not imported, as that module needs a database.
+BATCH_SIZE = 250
+RARE_WORDS = 5000
+
+
+def rescan(texts_per_user):
+    themes = []
+    for texts in texts_per_user:
+        most_common = term_counts(" ".join(texts)).most_common(1)
+        themes.append(most_common[0][0] if most_common else None)
+    return themes
+
+
+def batched(term_counts_per_user, document_frequency, total_documents):
+    themes = []
+    for i in range(0, len(term_counts_per_user), BATCH_SIZE):
+        themes.extend(top_terms(term_counts_per_user[i:i + BATCH_SIZE], document_frequency, total_documents))
+    return themes
+
+
+def run(name, fn, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        with Timer() as timer:
+            result = fn()
+        best = min(best, timer.elapsed)
+    print(f"{name:<32} best of {rounds}: {best * 1000:8.1f}ms")
+    return result
+
+
+def main(users, moments_per_user, rounds):
+    rng = random.Random(0)
+    rare = ["".join(rng.choice(string.ascii_lowercase) for _ in range(8)) for _ in range(RARE_WORDS)]
+    texts_per_user = [
+        [f"{random_text(rng, words=20)} {rng.choice(rare)}" for _ in range(moments_per_user)]
+        for _ in range(users)
+    ]
+    term_counts_per_user = [term_counts(" ".join(texts)) for texts in texts_per_user]
+    document_frequency = document_frequencies({"text": t} for texts in texts_per_user for t in texts)
+    total_documents = document_frequency.pop(DOCUMENTS_KEY)
+    print(f"{users} users x {moments_per_user} moments, {len(document_frequency)} distinct terms")
+
+    old = run("rescan + Counter", lambda: rescan(texts_per_user), rounds)
+    new = run("rollup terms + TF-IDF (NumPy)", lambda: batched(term_counts_per_user, document_frequency, total_documents), rounds)
+    changed = sum(1 for a, b in zip(old, new) if a != b)
+    print(f"themes differing from raw frequency: {changed}/{users} (common words no longer win)")
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    moments_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    main(users, moments_per_user, rounds)
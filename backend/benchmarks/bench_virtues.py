@@ -0,0 +1,71 @@
+"""
+Virtue classification over a 10k-moment week: chained substring checks versus
+the compiled matcher in app.virtues, for a growing number of custom virtues.
+The large sets cross REGEX_MIN_KEYWORDS and exercise the trie regex path.
+
+Pure CPU; no database needed.
+
+    python -m benchmarks.bench_virtues [moments] [rounds]
+"""
+import random
+import string
+import sys
+
+from app.virtues import BUILTIN_VIRTUES, matcher_for
+from .common import Timer, random_text
+
+CUSTOM_VIRTUES = ["Curiosity", "Patience", "Focus", "Humility", "Courage"]
+CUSTOM_VIRTUE_COUNTS = (0, 5, 50, 200)
+
+
+def custom_virtues(count, rng):
+    names = CUSTOM_VIRTUES[:count]
+    while len(names) < count:
+        names.append("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10))).title())
+    return names
+
+
+def chained_in(texts, custom_virtues):
+    """The old per-keyword `in` checks, extended to custom virtues the same way."""
+    counts = {"Resilience": 0, "Empathy": 0, "Grit": 0, **{name: 0 for name in custom_virtues}}
+    custom = [(name, name.lower()) for name in custom_virtues]
+    for text in texts:
+        text = text.lower()
+        if "resilience" in text or "strong" in text or "overcame" in text:
+            counts["Resilience"] += 1
+        if "empathy" in text or "understanding" in text or "compassion" in text:
+            counts["Empathy"] += 1
+        if "grit" in text or "perseverance" in text or "persistent" in text:
+            counts["Grit"] += 1
+        for name, keyword in custom:
+            if keyword in text:
+                counts[name] += 1
+    return counts
+
+
+def run(name, fn, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        with Timer() as timer:
+            result = fn()
+        best = min(best, timer.elapsed)
+    print(f"{name:<40} best of {rounds}: {best * 1000:8.2f}ms")
+    return result
+
+
+def main(moments, rounds):
+    rng = random.Random(0)
+    texts = [random_text(rng, words=rng.randint(8, 40)) for _ in range(moments)]
+    print(f"{moments} moments, {sum(map(len, BUILTIN_VIRTUES.values()))} built-in keywords")
+
+    for count in CUSTOM_VIRTUE_COUNTS:
+        custom = custom_virtues(count, rng)
+        matcher = matcher_for(custom)
+        expected = run(f"chained `in` ({count} custom)", lambda: chained_in(texts, custom), rounds)
+        actual = run(f"compiled matcher ({count} custom)", lambda: matcher.count(texts), rounds)
+        assert actual == expected, (actual, expected)
+
+if __name__ == "__main__":
+    moments = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    main(moments, rounds)
@@ -0,0 +1,123 @@
+"""
+WebSocket fan-out under load.
+
+Opens `sockets` authenticated connections to /ws/reflections on a live server
+(one user each), then publishes one event per user per round straight into
+ws_events, as worker.py does after a reflection chunk, and measures
+publish-to-receive latency. Every client checks that it only receives its
+own user's messages.
+
+Start the server against the benchmark database with several workers, so
+delivery crosses processes:
+
+    MONGODB_DB_NAME=innovation_character_bench uvicorn app.main:app --port 8001 --workers 4
+    python -m benchmarks.bench_ws_fanout [sockets] [rounds]
+
+Thousands of sockets need a higher open-file limit on both ends (`ulimit -n`).
+Requires websockets (see requirements.txt).
+"""
+import asyncio
+import json
+import sys
+import time
+
+import websockets
+from jose import jwt
+from pymongo import MongoClient
+
+from app.config import settings
+from app.ws_manager import WS_EVENTS_COLLECTION, publish_many
+from .common import BENCH_DB_NAME, MONGODB_URI, new_user_id, report
+
+WS_URL = "ws://127.0.0.1:8001/ws/reflections"
+CONNECT_CONCURRENCY = 200
+ROUND_TIMEOUT_SECONDS = 30
+
+
+def seed_users(db, count):
+    users = [{"_id": new_user_id(), "email": f"bench-ws{i}@example.com"} for i in range(count)]
+    remove_users(db)
+    db.users.insert_many(users, ordered=False)
+    return users
+
+
+def remove_users(db):
+    db.users.delete_many({"email": {"$regex": "^bench-ws"}})
+
+
+def token_for(user):
+    claims = {"sub": user["email"], "uid": str(user["_id"]), "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, settings.JWT_SECRET, algorithm="HS256")
+
+
+class Client:
+    def __init__(self, user):
+        self.user_id = str(user["_id"])
+        self.token = token_for(user)
+        self.latencies = []
+        self.received = 0
+        self.misdelivered = 0
+        self.socket = None
+
+    async def connect(self, limiter):
+        async with limiter:
+            self.socket = await websockets.connect(f"{WS_URL}?token={self.token}", max_queue=None)
+
+    async def listen(self):
+        async for raw in self.socket:
+            message = json.loads(raw)
+            self.received += 1
+            if message.get("userId") != self.user_id:
+                self.misdelivered += 1
+            self.latencies.append(time.time() - message["sentAt"])
+
+
+async def wait_for_delivery(clients, expected):
+    deadline = time.perf_counter() + ROUND_TIMEOUT_SECONDS
+    while sum(c.received for c in clients) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+
+async def main(sockets, rounds):
+    mongo = MongoClient(MONGODB_URI)
+    db = mongo.get_database(BENCH_DB_NAME)
+    clients = [Client(user) for user in seed_users(db, sockets)]
+
+    limiter = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(c.connect(limiter) for c in clients), return_exceptions=True)
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    clients = [c for c in clients if c.socket is not None]
+    print(f"connected {len(clients)}/{sockets} sockets in {time.perf_counter() - start:.1f}s ({failed} failed)")
+    listeners = [asyncio.create_task(c.listen()) for c in clients]
+    # Give every worker time to register its sockets.
+    await asyncio.sleep(1)
+
+    start = time.perf_counter()
+    for round_number in range(rounds):
+        sent_at = time.time()
+        publish_many(db, (
+            (c.user_id, {"type": "bench", "round": round_number, "userId": c.user_id, "sentAt": sent_at})
+            for c in clients
+        ))
+        await wait_for_delivery(clients, len(clients) * (round_number + 1))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for c in clients for latency in c.latencies]
+    report("publish -> receive", latencies, elapsed)
+    expected = len(clients) * rounds
+    print(f"delivered {sum(c.received for c in clients)}/{expected}, "
+          f"misdelivered {sum(c.misdelivered for c in clients)}")
+
+    for task in listeners:
+        task.cancel()
+    await asyncio.gather(*(c.socket.close() for c in clients), return_exceptions=True)
+    remove_users(db)
+    db[WS_EVENTS_COLLECTION].delete_many({})
+    mongo.close()
+
+
+if __name__ == "__main__":
+    sockets = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    asyncio.run(main(sockets, rounds))
@@ -0,0 +1,122 @@
+"""
+Idle WebSocket capacity of one worker.
+
+Opens `sockets` authenticated connections to a live single-worker server and
+keeps them open for `hold` seconds, answering the server's heartbeats like
+the web client does. /healthz is sampled throughout, so the table shows the
+worker's RSS and RSS per connection as the sockets pile up and while they
+sit idle. It then opens `probe` more sockets to check that connections over
+WS_MAX_CONNECTIONS are shed with 1013, closes everything, and checks that
+the worker's count returns to zero. Deflate is off as under gunicorn (see
+app.uvicorn_worker).
+
+    MONGODB_DB_NAME=innovation_character_bench WS_MAX_CONNECTIONS=10000 \
+        uvicorn app.main:app --port 8001 --ws-per-message-deflate false
+    python -m benchmarks.bench_ws_idle [sockets] [hold_seconds] [probe]
+
+10k sockets need `ulimit -n` well above 10k on both ends. Requires httpx and
+websockets.
+"""
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+import websockets
+from pymongo import MongoClient
+
+from .bench_ws_fanout import WS_URL, remove_users, seed_users, token_for
+from .common import BENCH_DB_NAME, MONGODB_URI
+
+HEALTH_URL = "http://127.0.0.1:8001/healthz"
+CONNECT_CONCURRENCY = 200
+SAMPLE_SECONDS = 5
+TRY_AGAIN_LATER = 1013
+
+
+async def open_socket(user, limiter, closes, listeners):
+    async with limiter:
+        # The server's application-level pings are what keep the socket alive.
+        socket = await websockets.connect(f"{WS_URL}?token={token_for(user)}", ping_interval=None, max_queue=None)
+    # Listen straight away: sockets opened early must answer pings while the rest connect.
+    listeners.append(asyncio.create_task(answer_pings(socket, closes)))
+    return socket
+
+
+async def answer_pings(socket, closes):
+    try:
+        async for raw in socket:
+            if json.loads(raw).get("type") == "ping":
+                await socket.send(json.dumps({"type": "pong"}))
+    except websockets.ConnectionClosed:
+        pass
+    closes.append(socket.close_code)
+
+
+async def sample(client, label, elapsed):
+    stats = (await client.get(HEALTH_URL)).json()["websockets"]
+    per_connection = stats["rssBytesPerConnection"]
+    print(f"{label:<10} t={elapsed:>6.0f}s connections={stats['connections']:>6} "
+          f"rss={stats['rssBytes'] / 2**20:>8.1f}MiB "
+          f"per_conn={'-' if per_connection is None else f'{per_connection / 1024:.1f}KiB':>9} "
+          f"shed={stats['shed']} reaped={stats['reaped']}")
+    return stats
+
+
+async def run(users, probe_users, hold):
+    limiter = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    closes, listeners = [], []
+    async with httpx.AsyncClient() as client:
+        start = time.perf_counter()
+        await sample(client, "baseline", 0)
+
+        results = await asyncio.gather(*(open_socket(u, limiter, closes, listeners) for u in users), return_exceptions=True)
+        sockets = [r for r in results if not isinstance(r, Exception)]
+        print(f"opened {len(sockets)}/{len(users)} in {time.perf_counter() - start:.1f}s")
+
+        hold_start = time.perf_counter()
+        while time.perf_counter() - hold_start < hold:
+            await sample(client, "holding", time.perf_counter() - start)
+            await asyncio.sleep(SAMPLE_SECONDS)
+        held = await sample(client, "held", time.perf_counter() - start)
+
+        probe_closes, probe_listeners = [], []
+        probes = await asyncio.gather(
+            *(open_socket(u, limiter, probe_closes, probe_listeners) for u in probe_users), return_exceptions=True
+        )
+        probes = [p for p in probes if not isinstance(p, Exception)]
+        if probe_listeners:
+            # Shed sockets are closed by the server straight away; close any it kept.
+            await asyncio.wait(probe_listeners, timeout=SAMPLE_SECONDS)
+        await asyncio.gather(*(p.close() for p in probes), return_exceptions=True)
+        await asyncio.gather(*probe_listeners, return_exceptions=True)
+        shed = probe_closes.count(TRY_AGAIN_LATER)
+        print(f"probe: {shed}/{len(probe_users)} extra sockets shed with 1013")
+
+        print(f"server closed {len(closes)} held sockets during the hold")
+        await asyncio.gather(*(s.close() for s in sockets), return_exceptions=True)
+        await asyncio.gather(*listeners, return_exceptions=True)
+        await asyncio.sleep(1)
+        after = await sample(client, "closed", time.perf_counter() - start)
+        if after["connections"]:
+            print(f"LEAK: server still tracks {after['connections']} connections")
+        return held
+
+
+def main(sockets, hold, probe):
+    mongo = MongoClient(MONGODB_URI)
+    db = mongo.get_database(BENCH_DB_NAME)
+    users = seed_users(db, sockets + probe)
+    try:
+        asyncio.run(run(users[:sockets], users[sockets:], hold))
+    finally:
+        remove_users(db)
+        mongo.close()
+
+
+if __name__ == "__main__":
+    sockets = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    hold = float(sys.argv[2]) if len(sys.argv) > 2 else 120
+    probe = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    main(sockets, hold, probe)
@@ -0,0 +1,80 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+The benchmarks talk to a real MongoDB (MONGODB_URI from the .env file) but use a
+separate database, BENCH_DB_NAME, so they never touch application data. Run them
+from the backend directory, e.g. `python -m benchmarks.bench_async_db`.
+"""
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+BENCH_DB_NAME = os.getenv("BENCH_DB_NAME", "innovation_character_bench")
+
+WORDS = [
+    "resilience", "strong", "overcame", "empathy", "understanding", "compassion",
+    "grit", "perseverance", "persistent", "team", "meeting", "customer", "launch",
+    "feedback", "deadline", "mentor", "listened", "helped", "learned", "failed",
+    "prototype", "design", "review", "patience", "focus", "today", "project",
+]
+
+
+def random_text(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def synthetic_moments(user_id, count, days=7, seed=0):
+    """Builds `count` moment documents for one user spread over the last `days` days."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [
+        {
+            "userId": user_id,
+            "text": random_text(rng),
+            "type": "moment" if rng.random() < 0.8 else "reflection",
+            "createdAt": now - timedelta(seconds=rng.randint(0, days * 86400)),
+            "audioUrl": None,
+        }
+        for _ in range(count)
+    ]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, latencies, elapsed):
+    """Prints throughput and latency percentiles (latencies in seconds)."""
+    count = len(latencies)
+    print(
+        f"{name:<32} n={count:<6} "
+        f"throughput={count / elapsed if elapsed else 0:>9.1f}/s "
+        f"mean={statistics.mean(latencies) * 1000 if latencies else 0:>8.2f}ms "
+        f"p50={percentile(latencies, 50) * 1000:>8.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:>8.2f}ms"
+    )
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def new_user_id():
+    return ObjectId()
@@ -0,0 +1,36 @@
+import sys
+from pymongo import MongoClient
+from app.config import settings
+from app.indexes import ensure_indexes_sync, explain_query_shapes
+
+def check_indexes(apply=False):
+    """
+    Runs explain() on every query shape registered in app/indexes.py and
+    reports any that fall back to a collection scan. Pass --apply to create the
+    registered indexes first. Exits non-zero if a COLLSCAN is found.
+    """
+    client = MongoClient(settings.MONGODB_URI, serverSelectionTimeoutMS=5000)
+    db = client.get_database(settings.MONGODB_DB_NAME)
+
+    if apply:
+        print("Applying index registry...")
+        ensure_indexes_sync(db)
+
+    failures = 0
+    for name, collection, stages in explain_query_shapes(db):
+        plan = " <- ".join(stages)
+        if "COLLSCAN" in stages:
+            failures += 1
+            print(f"❌ {collection}: {name}: {plan}")
+        else:
+            print(f"✅ {collection}: {name}: {plan}")
+
+    client.close()
+    if failures:
+        print(f"\n{failures} query shape(s) fall back to COLLSCAN.")
+        return 1
+    print("\nAll query shapes are index-backed.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(check_indexes(apply="--apply" in sys.argv))
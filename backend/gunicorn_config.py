@@ -2,7 +2,7 @@ import os
 
 workers = int(os.environ.get('GUNICORN_PROCESSES', '3'))
 threads = int(os.environ.get('GUNICORN_THREADS', '1'))
-worker_class = "uvicorn.workers.UvicornWorker"
+worker_class = "app.uvicorn_worker.UvicornWorker"
 bind = "0.0.0.0:8001"
 capture_output = True
 enable_stdio_inheritance = True
\ No newline at end of file
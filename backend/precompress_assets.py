@@ -0,0 +1,52 @@
+"""
+Writes .br and .gz siblings of the frontend build's text assets, so the API
+sends compressed files without compressing anything per request (see
+app/static_files.py). Run after every frontend build:
+
+    (cd ../frontend && pnpm build) && python precompress_assets.py
+
+Brotli variants need the optional `brotli` package; without it only gzip
+variants are written. Files that would not get smaller are skipped, and
+variants newer than their source are left alone, so re-running is cheap.
+"""
+import os
+import sys
+from app.static_files import available_encodings, compress
+
+DEFAULT_DIST = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "frontend", "dist"))
+COMPRESSIBLE = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".ico", ".wasm"}
+MIN_SIZE = 1024
+
+def precompress(path, encodings):
+    with open(path, "rb") as source:
+        data = source.read()
+    written = 0
+    for encoding, suffix in encodings:
+        target = path + suffix
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+            continue
+        compressed = compress(data, encoding)
+        if len(compressed) >= len(data):
+            continue
+        tmp_path = target + ".tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(compressed)
+        os.replace(tmp_path, target)
+        written += 1
+        print(f"{os.path.relpath(target)}: {len(data)} -> {len(compressed)} bytes")
+    return written
+
+def precompress_dist(dist):
+    encodings = available_encodings()
+    if len(encodings) < 2:
+        print("brotli is not installed; writing gzip variants only")
+    written = 0
+    for root, _, files in os.walk(dist):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE and os.path.getsize(path) >= MIN_SIZE:
+                written += precompress(path, encodings)
+    print(f"\nWrote {written} precompressed file(s) under {dist}.")
+
+if __name__ == "__main__":
+    precompress_dist(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIST)
@@ -1,4 +1,5 @@
 from app.db import db
+from app.catalog import bump_catalog_version
 
 def seed_database():
     # Clear existing data
@@ -113,5 +114,8 @@ def seed_database():
     db.integrations.insert_many(integrations_data)
     print("Seeded integrations collection.")
 
+    # Tell running workers to reload their content catalog.
+    bump_catalog_version(db)
+
 if __name__ == "__main__":
     seed_database()
\ No newline at end of file
@@ -111,6 +111,9 @@ def seed_production_database():
     else:
         print("Calendar insights collection already contains data. Skipping.")
 
+    # Tell running workers to reload their content catalog (see app/catalog.py).
+    db.catalog_meta.update_one({"_id": "content"}, {"$inc": {"version": 1}}, upsert=True)
+
     print("\n--- Production database seeding complete ---")
 
 if __name__ == "__main__":
@@ -80,6 +80,85 @@ def test_peer_feedback(headers):
         print(f"ERROR during Peer Feedback tests: {e}")
 
 
+def test_batch_moments(headers):
+    """Tests uploading several moments in one request."""
+    print("\n--- Testing Batch Moments ---")
+    try:
+        batch_payload = {
+            "moments": [
+                {"text": "Batch moment one.", "type": "moment"},
+                {"text": "Batch moment two.", "type": "moment", "createdAt": "2024-01-15T09:30:00Z"},
+            ]
+        }
+        response = requests.post(f"{BASE_URL}/moments/batch", headers=headers, json=batch_payload)
+        response.raise_for_status()
+        result = response.json()
+        assert result["inserted"] == 2 and result["failed"] == 0
+        assert [item["status"] for item in result["results"]] == ["created", "created"]
+        print(f"Batch Moments successful: {result['inserted']} inserted.")
+
+        response = requests.post(f"{BASE_URL}/moments/batch", headers=headers, json={"moments": []})
+        assert response.status_code == 422
+        print("Empty batch rejected.")
+    except Exception as e:
+        print(f"ERROR during Batch Moments test: {e}")
+
+
+def test_reflections_pagination(headers):
+    """Tests that reflections can be walked page by page with the cursor header."""
+    print("\n--- Testing Reflections Pagination ---")
+    try:
+        for i in range(3):
+            requests.post(f"{BASE_URL}/reflections", headers=headers, json={"text": f"Paged reflection {i}", "type": "reflection"}).raise_for_status()
+
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(f"{BASE_URL}/reflections", headers=headers, params=params)
+            response.raise_for_status()
+            page = response.json()
+            assert len(page) <= 2
+            seen.extend(item["id"] for item in page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)), "A reflection was returned on more than one page"
+        assert len(seen) >= 3
+        print(f"Reflections pagination successful: {len(seen)} reflections across pages.")
+
+        response = requests.get(f"{BASE_URL}/reflections", headers=headers, params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+        print("Invalid cursor rejected.")
+    except Exception as e:
+        print(f"ERROR during Reflections Pagination test: {e}")
+
+
+def test_custom_virtue_names(headers):
+    """Tests that custom virtues named like chart fields do not clobber them."""
+    print("\n--- Testing Custom Virtue Names ---")
+    try:
+        original = requests.get(f"{BASE_URL}/users/me/settings", headers=headers).json()
+        settings_payload = {"priorityVirtues": [], "customVirtues": ["Moments", "name", "Kindness"]}
+        requests.put(f"{BASE_URL}/users/me/settings", headers=headers, json=settings_payload).raise_for_status()
+        requests.post(f"{BASE_URL}/reflections", headers=headers, json={"text": "Kindness is the name of the game.", "type": "reflection"}).raise_for_status()
+
+        response = requests.get(f"{BASE_URL}/reflections/weekly", headers=headers)
+        response.raise_for_status()
+        point = response.json()["growthData"][0]
+        assert point["name"] == "This Week"
+        assert isinstance(point["Moments"], int)
+        assert set(point["customVirtues"]) == {"Moments", "name", "Kindness"}
+        assert point["customVirtues"]["Kindness"] >= 1
+        print(f"Custom virtue names successful: {point}")
+
+        requests.put(f"{BASE_URL}/users/me/settings", headers=headers, json=original).raise_for_status()
+    except Exception as e:
+        print(f"ERROR during Custom Virtue Names test: {e}")
+
+
 def run_all_tests():
     """Runs all tests."""
     print("--- Starting All Endpoint Tests ---")
@@ -89,7 +168,10 @@ def run_all_tests():
         test_get_articles(headers)
         test_get_reflections(headers)
         test_submit_reflection(headers)
+        test_reflections_pagination(headers)
+        test_batch_moments(headers)
         test_peer_feedback(headers)
+        test_custom_virtue_names(headers)
     except Exception as e:
         print(f"An error occurred during test execution: {e}")
     print("\n--- All endpoint tests completed ---")
@@ -1,12 +1,34 @@
 import requests
+import time
+import uuid
 
-def trigger_reflection_generation():
-    url = "http://localhost:8001/api/v1/tasks/generate-reflections"
+BASE_URL = "http://localhost:8001/api/v1"
+
+def trigger_reflection_generation(poll_seconds=2):
+    url = f"{BASE_URL}/tasks/generate-reflections"
     try:
-        response = requests.post(url)
+        # The idempotency key makes a retried POST return the same job.
+        response = requests.post(url, headers={"Idempotency-Key": str(uuid.uuid4())})
         response.raise_for_status()  # Raise an exception for bad status codes
-        print("Successfully triggered reflection generation.")
-        print("Response:", response.json())
+        task = response.json()
+        if response.status_code == 202:
+            print(f"Queued reflection generation as task {task['id']}.")
+        else:
+            print(f"Reflection generation already in progress as task {task['id']}.")
+
+        while task["status"] in ("queued", "running"):
+            time.sleep(poll_seconds)
+            response = requests.get(f"{BASE_URL}/tasks/{task['id']}")
+            response.raise_for_status()
+            task = response.json()
+            progress = task.get("progress") or {}
+            print(f"  {task['status']}: {progress.get('processed', 0)} users processed ({progress.get('usersPerSecond', 0)} users/s)")
+
+        if task["status"] == "succeeded":
+            print("Reflection generation finished.")
+            print("Result:", task["result"])
+        else:
+            print(f"Reflection generation failed: {task.get('error')}")
     except requests.exceptions.RequestException as e:
         print(f"An error occurred: {e}")
 
@@ -0,0 +1,80 @@
+"""
+Background job worker. Run alongside the web process (see Procfile):
+
+    python worker.py
+
+Claims queued jobs from the `jobs` collection one at a time and runs them
+outside any HTTP request. Several workers can run at once; claiming is atomic.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+from app.logging_config import setup_logging
+from app.config import settings
+from app.db import db
+from app.indexes import ensure_indexes_sync
+from app import jobs
+from app.background_tasks import run_weekly_reflections
+
+setup_logging()
+logger = logging.getLogger("app.worker")
+
+HANDLERS = {
+    jobs.GENERATE_REFLECTIONS: lambda job, on_progress: run_weekly_reflections(db, on_progress=on_progress),
+}
+
+class Heartbeat(threading.Thread):
+    """Keeps a running job's heartbeatAt fresh even while a chunk takes a long time."""
+
+    def __init__(self, job_id):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(settings.JOB_HEARTBEAT_SECONDS):
+            db.jobs.update_one({"_id": self.job_id, "status": jobs.RUNNING}, {"$currentDate": {"heartbeatAt": True}})
+
+    def stop(self):
+        self.stopped.set()
+
+def run_job(job):
+    handler = HANDLERS.get(job["type"])
+    if handler is None:
+        jobs.finish(db, job["_id"], error=f"Unknown job type: {job['type']}")
+        return
+    logger.info("Job started", extra={"jobId": str(job["_id"]), "type": job["type"], "attempt": job["attempts"]})
+    heartbeat = Heartbeat(job["_id"])
+    heartbeat.start()
+    try:
+        result = handler(job, lambda progress: jobs.report_progress(db, job["_id"], progress))
+    except Exception as e:
+        logger.exception("Job failed", extra={"jobId": str(job["_id"])})
+        jobs.finish(db, job["_id"], error=str(e))
+    else:
+        logger.info("Job succeeded", extra={"jobId": str(job["_id"])})
+        jobs.finish(db, job["_id"], result=result)
+    finally:
+        heartbeat.stop()
+
+def main():
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    ensure_indexes_sync(db)
+    logger.info("Worker started", extra={"workerId": worker_id})
+    while not stopping.is_set():
+        jobs.requeue_stale(db, settings.JOB_STALE_SECONDS)
+        job = jobs.claim_next(db, worker_id)
+        if job is None:
+            stopping.wait(settings.JOB_POLL_SECONDS)
+            continue
+        run_job(job)
+    logger.info("Worker stopped", extra={"workerId": worker_id})
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,8 @@ const Moments = () => {
   const navigate = useNavigate();
   const [moments, setMoments] = useState<Moment[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [playingId, setPlayingId] = useState<string | null>(null);
 
   useEffect(() => {
@@ -38,6 +40,7 @@ const Moments = () => {
         }
         console.log("--- Setting moments data ---", response.data);
         setMoments(response.data);
+        setNextCursor(response.headers["x-next-cursor"] ?? null);
       } catch (error: any) {
         console.error("--- Error in fetchMoments ---", error);
         toast.error(error.response?.data?.detail || String(error));
@@ -52,6 +55,21 @@ const Moments = () => {
     fetchMoments();
   }, [navigate]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await apiClient.get("/moments", { params: { cursor: nextCursor } });
+      setMoments((previous) => [...previous, ...response.data]);
+      setNextCursor(response.headers["x-next-cursor"] ?? null);
+    } catch (error: any) {
+      console.error("--- Error loading more moments ---", error);
+      toast.error(error.response?.data?.detail || String(error));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handlePlayMoment = (moment: Moment) => {
     if (!('speechSynthesis' in window)) {
       toast.error("Speech synthesis is not supported in your browser.");
@@ -108,6 +126,11 @@ const Moments = () => {
             </CardContent>
           </Card>
         )}
+        {!loading && nextCursor && (
+          <Button onClick={loadMore} disabled={loadingMore} variant="outline" className="w-full">
+            {loadingMore ? "Loading..." : "Load more"}
+          </Button>
+        )}
         <Button onClick={() => navigate("/reflection", { state: { type: "moment" } })} className="w-full mt-8">
           Log a New Moment
         </Button>
@@ -20,6 +20,8 @@ const Reflections = () => {
   const navigate = useNavigate();
   const [reflections, setReflections] = useState<Reflection[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [playingId, setPlayingId] = useState<string | null>(null);
 
   useEffect(() => {
@@ -38,6 +40,7 @@ const Reflections = () => {
         }
         console.log("--- Setting reflections data ---", response.data);
         setReflections(response.data);
+        setNextCursor(response.headers["x-next-cursor"] ?? null);
       } catch (error: any) {
         console.error("--- Error in fetchReflections ---", error);
         toast.error(error.response?.data?.detail || String(error));
@@ -52,6 +55,21 @@ const Reflections = () => {
     fetchReflections();
   }, [navigate]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await apiClient.get("/reflections", { params: { cursor: nextCursor } });
+      setReflections((previous) => [...previous, ...response.data]);
+      setNextCursor(response.headers["x-next-cursor"] ?? null);
+    } catch (error: any) {
+      console.error("--- Error loading more reflections ---", error);
+      toast.error(error.response?.data?.detail || String(error));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handlePlayReflection = (reflection: Reflection) => {
     if (!('speechSynthesis' in window)) {
       toast.error("Speech synthesis is not supported in your browser.");
@@ -108,6 +126,11 @@ const Reflections = () => {
             </CardContent>
           </Card>
         )}
+        {!loading && nextCursor && (
+          <Button onClick={loadMore} disabled={loadingMore} variant="outline" className="w-full">
+            {loadingMore ? "Loading..." : "Load more"}
+          </Button>
+        )}
         <Button onClick={() => navigate("/dashboard")} className="w-full mt-8">
           Back to Dashboard
         </Button>
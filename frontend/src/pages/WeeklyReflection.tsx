@@ -17,7 +17,7 @@ import {
 } from "recharts";
 import { toast } from "sonner";
 import { Skeleton } from "@/components/ui/skeleton";
-import apiClient from "@/lib/api";
+import apiClient, { API_URL } from "@/lib/api";
 
 interface AudioSummary {
   title: string;
@@ -35,6 +35,7 @@ interface GrowthDataPoint {
     Resilience: number;
     Empathy: number;
     Grit: number;
+    customVirtues?: Record<string, number>;
 }
 
 interface WeeklyReflectionData {
@@ -79,11 +80,18 @@ const WeeklyReflection = () => {
     };
     fetchData();
 
-    const wsUrl = `ws://${window.location.host}/ws/reflections`;
+    // Same host as the API; the browser sends the login cookie with the handshake.
+    const apiUrl = new URL(API_URL || "/", window.location.href);
+    const wsUrl = `${apiUrl.protocol === "https:" ? "wss:" : "ws:"}//${apiUrl.host}/ws/reflections`;
     const ws = new WebSocket(wsUrl);
     ws.onmessage = (event) => {
+      // Answer heartbeats; reflection messages only announce new data for this user.
       const data = JSON.parse(event.data);
-      setReflectionData(data);
+      if (data.type === "ping") {
+        ws.send(JSON.stringify({ type: "pong" }));
+      } else if (data.type === "weekly_reflection") {
+        fetchData();
+      }
     };
 
     return () => {